@@ -0,0 +1,113 @@
+"""Accepting a bid without multi-document transactions.
+
+The request is claimed first, with a compare-and-set on status "open" that
+also flags it `acceptance_pending`, so only one of several concurrent accepts
+can win. The bid updates that follow go out as one bulk write and are
+idempotent: if they fail or the process dies before they land, the flag is
+still set, and a retry of the same accept, the periodic reconciliation or the
+next startup (`finish_pending_acceptances`) replays them.
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateMany, UpdateOne
+
+REQUEST_PROJECTION = {
+    "_id": 0, "id": 1, "user_id": 1, "status": 1, "category": 1, "accepted_bid_id": 1, "acceptance_pending": 1
+}
+
+
+class BidAcceptanceError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def bid_updates(request_id: str, bid_id: str, now: datetime) -> List:
+    """Accept `bid_id` and reject every other bid on the request"""
+    return [
+        UpdateOne({"id": bid_id}, {"$set": {"status": "accepted", "updated_at": now}}),
+        UpdateMany(
+            {"service_request_id": request_id, "id": {"$ne": bid_id}},
+            {"$set": {"status": "rejected", "updated_at": now}}
+        )
+    ]
+
+
+async def complete_acceptance(database, request_id: str, bid_id: str, now: datetime):
+    await database.bids.bulk_write(bid_updates(request_id, bid_id, now), ordered=True)
+    await database.service_requests.update_one(
+        {"id": request_id, "accepted_bid_id": bid_id},
+        {"$unset": {"acceptance_pending": ""}}
+    )
+
+
+def is_interrupted_acceptance(request: Optional[dict], bid_id: str, user_id: str) -> bool:
+    """Whether `request` was claimed for `bid_id` by `user_id` and its bid updates are still pending"""
+    return bool(
+        request
+        and request.get("acceptance_pending")
+        and request.get("accepted_bid_id") == bid_id
+        and request["user_id"] == user_id
+    )
+
+
+def acceptance_error(request: Optional[dict], user_id: str, bid_found: bool) -> BidAcceptanceError:
+    """The error for an accept whose bid lookup or compare-and-set came up empty"""
+    if not request:
+        return BidAcceptanceError(404, "Service request not found")
+    if request["user_id"] != user_id:
+        return BidAcceptanceError(403, "Can only accept bids on your own requests")
+    if request["status"] != "open":
+        return BidAcceptanceError(400, "Can only accept bids on open requests")
+    if not bid_found:
+        return BidAcceptanceError(404, "Bid not found")
+    # The request was claimed and released again between the two reads
+    return BidAcceptanceError(409, "The request changed while accepting, try again")
+
+
+async def perform_bid_acceptance(
+    database, request_id: str, bid_id: str, user_id: str, now: Optional[datetime] = None
+) -> Tuple[dict, dict]:
+    """Accept `bid_id` for the owner `user_id`; returns (request before acceptance, bid)"""
+    now = now or datetime.utcnow()
+    bid = await database.bids.find_one(
+        {"id": bid_id, "service_request_id": request_id},
+        {"_id": 0, "id": 1, "price": 1}
+    )
+    request = None
+    if bid:
+        request = await database.service_requests.find_one_and_update(
+            {"id": request_id, "user_id": user_id, "status": "open"},
+            {"$set": {
+                "status": "in_progress",
+                "accepted_bid_id": bid_id,
+                "acceptance_pending": True,
+                "updated_at": now
+            }},
+            projection=REQUEST_PROJECTION,
+            return_document=ReturnDocument.BEFORE
+        )
+    if not request:
+        current = await database.service_requests.find_one({"id": request_id}, REQUEST_PROJECTION)
+        if bid and is_interrupted_acceptance(current, bid_id, user_id):
+            # This accept already claimed the request, but its bid updates never landed
+            await complete_acceptance(database, request_id, bid_id, now)
+            return {**current, "status": "open"}, bid
+        raise acceptance_error(current, user_id, bool(bid))
+
+    await complete_acceptance(database, request_id, bid_id, now)
+    return request, bid
+
+
+async def finish_pending_acceptances(database) -> int:
+    """Replay the bid updates of acceptances interrupted before they completed"""
+    finished = 0
+    async for request in database.service_requests.find(
+        {"acceptance_pending": True},
+        {"_id": 0, "id": 1, "accepted_bid_id": 1, "updated_at": 1}
+    ):
+        await complete_acceptance(database, request["id"], request["accepted_bid_id"], request["updated_at"])
+        finished += 1
+    return finished
@@ -0,0 +1,58 @@
+"""Bid statistics denormalized onto each service request.
+
+Listings sort and display bid counts and prices without reading db.bids.
+`bid_stats_increment` keeps them current as bids arrive; `bid_stats_repair`
+rewrites any that drifted from a recomputation over the bids.
+"""
+from typing import Optional, Tuple
+
+BID_STAT_FIELDS = ["bid_count", "bid_price_sum", "min_bid_price", "max_bid_price"]
+EMPTY_BID_STATS = {"bid_count": 0, "bid_price_sum": 0, "min_bid_price": None, "max_bid_price": None}
+
+# $group accumulators computing BID_STAT_FIELDS from bid documents
+BID_STATS_GROUP = {
+    "bid_count": {"$sum": 1},
+    "bid_price_sum": {"$sum": "$price"},
+    "min_bid_price": {"$min": "$price"},
+    "max_bid_price": {"$max": "$price"}
+}
+
+
+def bid_stats_increment(price: float) -> list:
+    """Pipeline update folding one new bid price into a request's bid statistics"""
+    # Aggregation $min/$max skip nulls, unlike the $min/$max update operators
+    return [{"$set": {
+        "bid_count": {"$add": [{"$ifNull": ["$bid_count", 0]}, 1]},
+        "bid_price_sum": {"$add": [{"$ifNull": ["$bid_price_sum", 0]}, price]},
+        "min_bid_price": {"$min": ["$min_bid_price", price]},
+        "max_bid_price": {"$max": ["$max_bid_price", price]}
+    }}]
+
+
+def bid_stats_summary(request: dict) -> dict:
+    """Public bid statistics for a request document carrying BID_STAT_FIELDS"""
+    bid_count = request.pop("bid_count", 0) or 0
+    price_sum = request.pop("bid_price_sum", 0) or 0
+    min_price = request.pop("min_bid_price", None)
+    max_price = request.pop("max_bid_price", None)
+    summary = {"bid_count": bid_count}
+    if bid_count:
+        summary["avg_bid_price"] = round(price_sum / bid_count, 2)
+        summary["min_bid_price"] = min_price
+        summary["max_bid_price"] = max_price
+    return summary
+
+
+def bid_stats_repair(request: dict, expected: Optional[dict]) -> Optional[Tuple[dict, dict]]:
+    """(filter, update) rewriting `request`'s statistics to `expected`, or None if they match.
+
+    `expected` is a recomputation over the request's bids (None when it has
+    none). The filter compares all four fields against the values read, so
+    a bid counted after the recomputation makes the update miss instead of
+    being overwritten.
+    """
+    expected = expected or EMPTY_BID_STATS
+    observed = {field: request.get(field) for field in BID_STAT_FIELDS}
+    if all(observed[field] == expected[field] for field in BID_STAT_FIELDS):
+        return None
+    return {"id": request["id"], **observed}, {"$set": {field: expected[field] for field in BID_STAT_FIELDS}}
@@ -0,0 +1,163 @@
+"""Caches for data that may be served slightly stale."""
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """LRU cache whose entries also expire `ttl` seconds after they were stored.
+
+    With `maxbytes`, values must support len() and the cache also evicts until
+    their combined length fits; a single value longer than that is not stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, maxbytes: Optional[int] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.bytes = 0
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        self.delete(key)
+        if self.maxbytes is not None:
+            if len(value) > self.maxbytes:
+                return
+            self.bytes += len(value)
+        self.entries[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        while len(self.entries) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+            self.delete(next(iter(self.entries)))
+
+    def delete(self, key: Hashable):
+        entry = self.entries.pop(key, None)
+        if entry is not None and self.maxbytes is not None:
+            self.bytes -= len(entry[1])
+
+    def clear(self):
+        self.entries.clear()
+        self.bytes = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+class CacheBackend(ABC):
+    """Storage behind ResponseCache.
+
+    Generation counters live in the backend too, so a shared backend (e.g.
+    Redis with GET/SETEX/INCR) also shares invalidations between workers.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float):
+        ...
+
+    @abstractmethod
+    async def generation(self, name: str) -> int:
+        ...
+
+    @abstractmethod
+    async def bump_generation(self, name: str) -> int:
+        ...
+
+    @abstractmethod
+    async def clear(self):
+        ...
+
+    def size(self) -> int:
+        return -1  # Unknown
+
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process LRU with TTL, bounded by entry count and by total bytes; invalidations only reach this process"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 10, maxbytes: int = 64 * 1024 * 1024):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl, maxbytes=maxbytes)
+        self.generations: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return self.entries.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        self.entries.set(key, value, ttl)
+
+    async def generation(self, name: str) -> int:
+        return self.generations.get(name, 0)
+
+    async def bump_generation(self, name: str) -> int:
+        self.generations[name] = self.generations.get(name, 0) + 1
+        return self.generations[name]
+
+    async def clear(self):
+        self.entries.clear()
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class ResponseCache:
+    """Pre-serialized responses keyed on normalized parameters.
+
+    Every key embeds the current generation of the collections the response
+    was read from. Writers bump those generations, so entries computed before
+    a write are never looked up again and simply age out of the backend.
+    Values are the response body prefixed with a line of JSON-encoded headers.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: float):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def key(self, namespace: str, depends_on: tuple, params: dict) -> str:
+        generations = [await self.backend.generation(name) for name in depends_on]
+        normalized = json.dumps(params, sort_keys=True, default=str, separators=(",", ":"))
+        return f"{namespace}:{':'.join(map(str, generations))}:{normalized}"
+
+    async def get(self, key: str) -> Optional[Tuple[bytes, dict]]:
+        """Cached (body, headers), or None"""
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        headers, _, body = value.partition(b"\n")
+        return body, json.loads(headers)
+
+    async def set(self, key: str, body: bytes, headers: Optional[dict] = None):
+        await self.backend.set(key, json.dumps(headers or {}).encode() + b"\n" + body, self.ttl)
+
+    async def invalidate(self, *collections: str):
+        for name in collections:
+            await self.backend.bump_generation(name)
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "invalidations": self.invalidations,
+            "entries": self.backend.size(),
+            "ttl_seconds": self.ttl
+        }
@@ -0,0 +1,36 @@
+"""Single-flight execution of identical concurrent reads."""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """Run at most one `load()` per key at a time; concurrent callers share its result.
+
+    Callers receive the very same object, so results must be treated as
+    read-only. A caller that is cancelled (e.g. the client disconnected) does
+    not cancel the shared execution the others are waiting on.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, load: Callable[[], Awaitable[Any]]) -> Any:
+        future = self.in_flight.get(key)
+        if future is None:
+            self.executions += 1
+            future = asyncio.ensure_future(load())
+            self.in_flight[key] = future
+            future.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(future)
+
+    def stats(self) -> dict:
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.in_flight)
+        }
@@ -0,0 +1,61 @@
+"""Keyset (cursor) pagination over a (sort field, id) ordering.
+
+Kept free of database and web framework imports so the cursor encoding and
+the generated predicates can be unit tested on their own.
+"""
+import base64
+import json
+from datetime import datetime
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_field: str, sort_direction: int, doc: dict) -> str:
+    """Build an opaque keyset cursor pointing just past `doc` in the given sort order"""
+    value = doc.get(sort_field)
+    if isinstance(value, datetime):
+        value = {"$dt": value.isoformat()}
+    payload = {"f": sort_field, "d": sort_direction, "v": value, "id": doc["id"]}
+    raw = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str, sort_direction: int):
+    """Decode a cursor produced by encode_cursor, returning (sort value, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        value = payload["v"]
+        if isinstance(value, dict):
+            value = datetime.fromisoformat(value["$dt"])
+        last_id = payload["id"]
+    except (ValueError, KeyError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+    if payload.get("f") != sort_field or payload.get("d") != sort_direction:
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    return value, last_id
+
+
+def keyset_filter(sort_field: str, sort_direction: int, value, last_id: str) -> dict:
+    """Mongo predicate selecting documents after (value, last_id) in sort order.
+
+    Missing/null sort values sort before everything ascending and after
+    everything descending, matching MongoDB's own ordering of nulls.
+    """
+    id_op = "$gt" if sort_direction == 1 else "$lt"
+    if value is None:
+        if sort_direction == 1:
+            return {"$or": [
+                {sort_field: None, "id": {id_op: last_id}},
+                {sort_field: {"$ne": None}}
+            ]}
+        return {sort_field: None, "id": {id_op: last_id}}
+    clauses = [
+        {sort_field: {id_op: value}},
+        {sort_field: value, "id": {id_op: last_id}}
+    ]
+    if sort_direction == -1:
+        clauses.append({sort_field: None})
+    return {"$or": clauses}
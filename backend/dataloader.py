@@ -0,0 +1,63 @@
+"""Request-scoped batching of lookups by id (the DataLoader pattern).
+
+Every `load()` issued during one event loop tick is collected and resolved
+with a single batch call, and each key is fetched at most once per loader.
+Loaders are meant to live for one HTTP request, so nothing is cached across
+requests.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+BatchLoad = Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]]
+
+
+class DataLoader:
+    def __init__(self, batch_load: BatchLoad):
+        self.batch_load = batch_load
+        self.futures: Dict[Hashable, asyncio.Future] = {}
+        self.queue: List[Hashable] = []
+        self.batches = 0
+        # The event loop only holds weak references to tasks; keep running batches alive
+        self.tasks: Set[asyncio.Task] = set()
+
+    def load(self, key: Hashable) -> "asyncio.Future":
+        """Future resolving to the value for `key`, or None if there is none"""
+        future = self.futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self.futures[key] = future
+            if not self.queue:
+                loop.call_soon(self.dispatch)
+            self.queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def dispatch(self):
+        keys, self.queue = self.queue, []
+        self.batches += 1
+        task = asyncio.ensure_future(self.resolve(keys))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def resolve(self, keys: List[Hashable]):
+        try:
+            values = await self.batch_load(keys)
+        except BaseException as e:
+            # Including cancellation: no caller may be left waiting on a batch that will never finish
+            for key in keys:
+                future = self.futures[key]
+                if future.done():
+                    continue
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+        for key in keys:
+            if not self.futures[key].done():
+                self.futures[key].set_result(values.get(key))
@@ -0,0 +1,71 @@
+"""Streaming NDJSON/CSV exports straight from Motor cursors.
+
+Documents are encoded one at a time as the cursor yields them, so memory use
+depends on the batch size rather than on how many documents are exported.
+"""
+import csv
+import io
+from datetime import datetime
+from typing import AsyncIterator, Callable, List
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv"
+}
+
+SERVICE_REQUEST_EXPORT_COLUMNS = [
+    "id", "user_id", "title", "description", "category", "subcategory", "status",
+    "budget_min", "budget_max", "deadline", "location", "show_best_bids",
+    "bid_count", "min_bid_price", "max_bid_price", "created_at", "updated_at"
+]
+BID_EXPORT_COLUMNS = [
+    "id", "service_request_id", "provider_id", "provider_name", "price", "proposal", "status",
+    "start_date", "duration_days", "duration_description", "created_at", "updated_at"
+]
+PROVIDER_EXPORT_COLUMNS = [
+    "id", "business_name", "services", "location", "latitude", "longitude", "phone", "email",
+    "website", "google_rating", "google_reviews_count", "verified", "created_at"
+]
+
+
+def export_projection(columns: List[str]) -> dict:
+    return {"_id": 0, **{column: 1 for column in columns}}
+
+
+def csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, list):
+        return ";".join(str(item) for item in value)
+    return value
+
+
+async def ndjson_lines(cursor, encode: Callable[[dict], bytes]) -> AsyncIterator[bytes]:
+    try:
+        async for doc in cursor:
+            yield encode(doc) + b"\n"
+    finally:
+        await cursor.close()
+
+
+async def csv_lines(cursor, columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        line = buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+        return line
+
+    writer.writerow(columns)
+    yield flush()
+    try:
+        async for doc in cursor:
+            writer.writerow([csv_cell(doc.get(column)) for column in columns])
+            yield flush()
+    finally:
+        await cursor.close()
@@ -0,0 +1,282 @@
+"""Content-addressed image storage backed by MongoDB GridFS.
+
+Images are stored once per SHA-256 of their bytes; the hex digest doubles as
+the GridFS filename and as the public reference `/api/images/<hash>` that
+service requests keep in their `images` list instead of inline data URLs.
+"""
+import asyncio
+import base64
+import binascii
+import hashlib
+import io
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Dict, List, Optional
+
+from gridfs.errors import NoFile
+from motor.motor_asyncio import AsyncIOMotorGridFSBucket
+from PIL import Image, ImageDraw, ImageOps, UnidentifiedImageError
+from pymongo.errors import DuplicateKeyError
+
+IMAGE_URL_PREFIX = "/api/images/"
+CHUNK_SIZE = 255 * 1024  # GridFS default chunk size
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+
+# Resized copies generated once per stored image (longest edge in pixels)
+IMAGE_VARIANTS = {
+    "thumb": 320,
+    "medium": 1024
+}
+VARIANT_FORMAT = "WEBP"
+VARIANT_CONTENT_TYPE = "image/webp"
+VARIANT_QUALITY = 80
+
+# The only types stored and served inline. The type is taken from what Pillow
+# decodes, never from the uploader, so no HTML or SVG is served from our origin.
+IMAGE_CONTENT_TYPES = {
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+    "GIF": "image/gif",
+    "WEBP": "image/webp"
+}
+
+# Decoding and resizing is CPU bound; keep it off the event loop
+variant_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-variants")
+
+
+class ImageTooLarge(Exception):
+    pass
+
+
+class UnsupportedImageType(ValueError):
+    pass
+
+
+def image_url(content_hash: str) -> str:
+    return f"{IMAGE_URL_PREFIX}{content_hash}"
+
+
+def is_data_url(image: str) -> bool:
+    return image.startswith("data:")
+
+
+def detect_content_type(source) -> str:
+    """Content type of a supported raster image (bytes or a binary file)"""
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    source.seek(0)
+    try:
+        # Only reads the header; the pixels are not decoded
+        with Image.open(source) as image:
+            image_format = image.format
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        image_format = None
+    finally:
+        source.seek(0)
+    if image_format not in IMAGE_CONTENT_TYPES:
+        raise UnsupportedImageType("Only JPEG, PNG, GIF and WebP images are supported")
+    return IMAGE_CONTENT_TYPES[image_format]
+
+
+def content_safety_headers(content_type: str) -> Dict[str, str]:
+    """Headers keeping browsers from rendering anything but a supported image.
+
+    Files stored before uploads were verified may carry any declared type;
+    those are offered as downloads instead of being rendered from our origin.
+    """
+    headers = {"X-Content-Type-Options": "nosniff"}
+    if content_type not in IMAGE_CONTENT_TYPES.values():
+        headers["Content-Disposition"] = "attachment"
+    return headers
+
+
+def placeholder_data_url(label: str, background: str, size=(400, 300)) -> str:
+    """PNG data URL of a flat placeholder with a centered label (sample data)"""
+    image = Image.new("RGB", size, background)
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), label)
+    draw.text(((size[0] - right + left) / 2, (size[1] - bottom + top) / 2), label, fill="#374151")
+    output = io.BytesIO()
+    image.save(output, "PNG")
+    return "data:image/png;base64," + base64.b64encode(output.getvalue()).decode("ascii")
+
+
+def parse_data_url(data_url: str):
+    """Split a base64 `data:` URL into (content_type, bytes)"""
+    header, _, encoded = data_url.partition(",")
+    content_type = header[len("data:"):].split(";")[0] or "image/jpeg"
+    try:
+        return content_type, base64.b64decode(encoded)
+    except (binascii.Error, ValueError):
+        raise ValueError("Malformed image data URL")
+
+
+def parse_byte_range(range_header: str, length: int):
+    """Resolve a `Range: bytes=...` header to an inclusive (start, end) pair.
+
+    Only the first range of a multi-range request is honoured. Returns None
+    when the range cannot be satisfied for a file of `length` bytes.
+    """
+    unit, _, ranges = range_header.partition("=")
+    if unit.strip().lower() != "bytes" or not ranges:
+        return None
+    first, _, last = ranges.split(",")[0].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else length - 1
+        else:
+            suffix = int(last)
+            if suffix <= 0:
+                return None
+            start, end = max(0, length - suffix), length - 1
+    except ValueError:
+        return None
+    end = min(end, length - 1)
+    if start > end:
+        return None
+    return start, end
+
+
+def variant_name(content_hash: str, variant: str) -> str:
+    return f"{content_hash}.{variant}"
+
+
+def render_variants(source) -> Dict[str, bytes]:
+    """Encode every IMAGE_VARIANTS size of `source` (bytes or a binary file).
+
+    Orientation from EXIF is applied to the pixels and the metadata itself is
+    dropped by re-encoding. Images Pillow cannot decode yield no variants and
+    are served as stored.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    source.seek(0)
+    try:
+        with Image.open(source) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "transparency" in image.info else "RGB")
+            variants = {}
+            for variant, size in IMAGE_VARIANTS.items():
+                resized = image.copy()
+                resized.thumbnail((size, size), Image.LANCZOS)
+                output = io.BytesIO()
+                resized.save(output, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+                variants[variant] = output.getvalue()
+            return variants
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError):
+        return {}
+
+
+class ImageStore:
+    def __init__(self, database, bucket_name: str = "images"):
+        self.bucket = AsyncIOMotorGridFSBucket(database, bucket_name=bucket_name, chunk_size_bytes=CHUNK_SIZE)
+        self.files = database[f"{bucket_name}.files"]
+
+    async def create_indexes(self):
+        # Pending uploads get unique temporary names, so this only rejects a
+        # second copy of the same content hash.
+        await self.files.create_index([("filename", 1)], unique=True)
+
+    async def exists(self, content_hash: str) -> bool:
+        return await self.files.count_documents({"filename": content_hash}, limit=1) > 0
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], content_type: str) -> dict:
+        """Write chunks to GridFS while hashing them; keep only one copy per hash"""
+        digest = hashlib.sha256()
+        length = 0
+        grid_in = self.bucket.open_upload_stream(
+            f"pending-{uuid.uuid4()}",
+            metadata={"content_type": content_type}
+        )
+        try:
+            async for chunk in chunks:
+                length += len(chunk)
+                if length > MAX_IMAGE_BYTES:
+                    raise ImageTooLarge(f"Images are limited to {MAX_IMAGE_BYTES // (1024 * 1024)}MB")
+                digest.update(chunk)
+                await grid_in.write(chunk)
+            await grid_in.close()
+        except BaseException:
+            await grid_in.abort()
+            raise
+
+        content_hash = digest.hexdigest()
+        created = False
+        if await self.exists(content_hash):
+            await self.bucket.delete(grid_in._id)
+        else:
+            try:
+                await self.bucket.rename(grid_in._id, content_hash)
+                created = True
+            except DuplicateKeyError:
+                # A concurrent upload of the same bytes won the rename
+                await self.bucket.delete(grid_in._id)
+        return {"hash": content_hash, "content_type": content_type, "length": length, "created": created}
+
+    async def save_bytes(self, data: bytes) -> dict:
+        content_type = detect_content_type(data)
+
+        async def chunks():
+            for start in range(0, len(data), CHUNK_SIZE):
+                yield data[start:start + CHUNK_SIZE]
+        stored = await self.save_stream(chunks(), content_type)
+        if stored["created"]:
+            await self.create_variants(stored["hash"], data)
+        return stored
+
+    async def create_variants(self, content_hash: str, source) -> List[str]:
+        """Render resized variants in the worker pool and store them beside the original"""
+        loop = asyncio.get_running_loop()
+        variants = await loop.run_in_executor(variant_executor, render_variants, source)
+        for variant, data in variants.items():
+            try:
+                await self.bucket.upload_from_stream(
+                    variant_name(content_hash, variant),
+                    data,
+                    metadata={"content_type": VARIANT_CONTENT_TYPE, "variant_of": content_hash}
+                )
+            except DuplicateKeyError:
+                pass
+        return list(variants)
+
+    async def open(self, content_hash: str, variant: Optional[str] = None):
+        """Return a GridOut for the image (or its variant), or None if it is not stored"""
+        filename = variant_name(content_hash, variant) if variant else content_hash
+        try:
+            return await self.bucket.open_download_stream_by_name(filename)
+        except NoFile:
+            return None
+
+    async def externalize(self, images: Optional[List[str]]) -> List[str]:
+        """Replace inline data URLs with store references, leaving other URLs as-is"""
+        result = []
+        for image in images or []:
+            if is_data_url(image):
+                _, data = parse_data_url(image)
+                stored = await self.save_bytes(data)
+                image = image_url(stored["hash"])
+            result.append(image)
+        return result
+
+
+async def migrate_inline_images(collection, store: ImageStore) -> int:
+    """Move inline data URLs out of `collection.images` into the store"""
+    migrated = 0
+    cursor = collection.find(
+        {"images": {"$regex": "^data:"}},
+        {"_id": 0, "id": 1, "images": 1}
+    ).batch_size(50)
+    async for doc in cursor:
+        try:
+            images = await store.externalize(doc["images"])
+        except ValueError:
+            # Not a supported image; get_service_request_image serves it as a download
+            continue
+        await collection.update_one(
+            {"id": doc["id"], "images": doc["images"]},
+            {"$set": {"images": images}}
+        )
+        migrated += 1
+    return migrated
@@ -0,0 +1,196 @@
+"""Offline location helpers backed by a small built-in US city gazetteer.
+
+The deployment has no network access, so free-text locations such as
+"Austin, TX" are resolved against the table below instead of a geocoding API.
+"""
+import re
+from typing import Optional, Tuple
+
+US_STATES = {
+    "AL": "Alabama", "AK": "Alaska", "AZ": "Arizona", "AR": "Arkansas", "CA": "California",
+    "CO": "Colorado", "CT": "Connecticut", "DE": "Delaware", "DC": "District of Columbia",
+    "FL": "Florida", "GA": "Georgia", "HI": "Hawaii", "ID": "Idaho", "IL": "Illinois",
+    "IN": "Indiana", "IA": "Iowa", "KS": "Kansas", "KY": "Kentucky", "LA": "Louisiana",
+    "ME": "Maine", "MD": "Maryland", "MA": "Massachusetts", "MI": "Michigan", "MN": "Minnesota",
+    "MS": "Mississippi", "MO": "Missouri", "MT": "Montana", "NE": "Nebraska", "NV": "Nevada",
+    "NH": "New Hampshire", "NJ": "New Jersey", "NM": "New Mexico", "NY": "New York",
+    "NC": "North Carolina", "ND": "North Dakota", "OH": "Ohio", "OK": "Oklahoma", "OR": "Oregon",
+    "PA": "Pennsylvania", "RI": "Rhode Island", "SC": "South Carolina", "SD": "South Dakota",
+    "TN": "Tennessee", "TX": "Texas", "UT": "Utah", "VT": "Vermont", "VA": "Virginia",
+    "WA": "Washington", "WV": "West Virginia", "WI": "Wisconsin", "WY": "Wyoming"
+}
+STATE_CODES = {name.lower(): code for code, name in US_STATES.items()}
+
+# (city, state code) -> (latitude, longitude)
+CITY_GAZETTEER = {
+    ("new york", "NY"): (40.7128, -74.0060),
+    ("manhattan", "NY"): (40.7831, -73.9712),
+    ("brooklyn", "NY"): (40.6782, -73.9442),
+    ("queens", "NY"): (40.7282, -73.7949),
+    ("bronx", "NY"): (40.8448, -73.8648),
+    ("staten island", "NY"): (40.5795, -74.1502),
+    ("buffalo", "NY"): (42.8864, -78.8784),
+    ("rochester", "NY"): (43.1566, -77.6088),
+    ("albany", "NY"): (42.6526, -73.7562),
+    ("los angeles", "CA"): (34.0522, -118.2437),
+    ("hollywood", "CA"): (34.0928, -118.3287),
+    ("beverly hills", "CA"): (34.0736, -118.4004),
+    ("santa monica", "CA"): (34.0195, -118.4912),
+    ("venice", "CA"): (33.9850, -118.4695),
+    ("long beach", "CA"): (33.7701, -118.1937),
+    ("pasadena", "CA"): (34.1478, -118.1445),
+    ("irvine", "CA"): (33.6846, -117.8265),
+    ("anaheim", "CA"): (33.8366, -117.9143),
+    ("san diego", "CA"): (32.7157, -117.1611),
+    ("san francisco", "CA"): (37.7749, -122.4194),
+    ("oakland", "CA"): (37.8044, -122.2711),
+    ("berkeley", "CA"): (37.8715, -122.2730),
+    ("san jose", "CA"): (37.3382, -121.8863),
+    ("palo alto", "CA"): (37.4419, -122.1430),
+    ("sacramento", "CA"): (38.5816, -121.4944),
+    ("fresno", "CA"): (36.7378, -119.7871),
+    ("chicago", "IL"): (41.8781, -87.6298),
+    ("houston", "TX"): (29.7604, -95.3698),
+    ("dallas", "TX"): (32.7767, -96.7970),
+    ("austin", "TX"): (30.2672, -97.7431),
+    ("san antonio", "TX"): (29.4241, -98.4936),
+    ("fort worth", "TX"): (32.7555, -97.3308),
+    ("el paso", "TX"): (31.7619, -106.4850),
+    ("arlington", "TX"): (32.7357, -97.1081),
+    ("plano", "TX"): (33.0198, -96.6989),
+    ("phoenix", "AZ"): (33.4484, -112.0740),
+    ("mesa", "AZ"): (33.4152, -111.8315),
+    ("scottsdale", "AZ"): (33.4942, -111.9261),
+    ("tucson", "AZ"): (32.2226, -110.9747),
+    ("philadelphia", "PA"): (39.9526, -75.1652),
+    ("pittsburgh", "PA"): (40.4406, -79.9959),
+    ("jacksonville", "FL"): (30.3322, -81.6557),
+    ("miami", "FL"): (25.7617, -80.1918),
+    ("tampa", "FL"): (27.9506, -82.4572),
+    ("orlando", "FL"): (28.5383, -81.3792),
+    ("clearwater", "FL"): (27.9659, -82.8001),
+    ("columbus", "OH"): (39.9612, -82.9988),
+    ("cleveland", "OH"): (41.4993, -81.6944),
+    ("cincinnati", "OH"): (39.1031, -84.5120),
+    ("charlotte", "NC"): (35.2271, -80.8431),
+    ("raleigh", "NC"): (35.7796, -78.6382),
+    ("durham", "NC"): (35.9940, -78.8986),
+    ("indianapolis", "IN"): (39.7684, -86.1581),
+    ("seattle", "WA"): (47.6062, -122.3321),
+    ("tacoma", "WA"): (47.2529, -122.4443),
+    ("spokane", "WA"): (47.6588, -117.4260),
+    ("denver", "CO"): (39.7392, -104.9903),
+    ("colorado springs", "CO"): (38.8339, -104.8214),
+    ("boulder", "CO"): (40.0150, -105.2705),
+    ("washington", "DC"): (38.9072, -77.0369),
+    ("boston", "MA"): (42.3601, -71.0589),
+    ("cambridge", "MA"): (42.3736, -71.1097),
+    ("detroit", "MI"): (42.3314, -83.0458),
+    ("ann arbor", "MI"): (42.2808, -83.7430),
+    ("grand rapids", "MI"): (42.9634, -85.6681),
+    ("nashville", "TN"): (36.1627, -86.7816),
+    ("memphis", "TN"): (35.1495, -90.0490),
+    ("knoxville", "TN"): (35.9606, -83.9207),
+    ("portland", "OR"): (45.5152, -122.6784),
+    ("oklahoma city", "OK"): (35.4676, -97.5164),
+    ("tulsa", "OK"): (36.1540, -95.9928),
+    ("las vegas", "NV"): (36.1699, -115.1398),
+    ("reno", "NV"): (39.5296, -119.8138),
+    ("louisville", "KY"): (38.2527, -85.7585),
+    ("baltimore", "MD"): (39.2904, -76.6122),
+    ("milwaukee", "WI"): (43.0389, -87.9065),
+    ("madison", "WI"): (43.0731, -89.4012),
+    ("albuquerque", "NM"): (35.0844, -106.6504),
+    ("kansas city", "MO"): (39.0997, -94.5786),
+    ("st. louis", "MO"): (38.6270, -90.1994),
+    ("atlanta", "GA"): (33.7490, -84.3880),
+    ("savannah", "GA"): (32.0809, -81.0912),
+    ("virginia beach", "VA"): (36.8529, -75.9780),
+    ("richmond", "VA"): (37.5407, -77.4360),
+    ("omaha", "NE"): (41.2565, -95.9345),
+    ("minneapolis", "MN"): (44.9778, -93.2650),
+    ("saint paul", "MN"): (44.9537, -93.0900),
+    ("new orleans", "LA"): (29.9511, -90.0715),
+    ("wichita", "KS"): (37.6872, -97.3301),
+    ("salt lake city", "UT"): (40.7608, -111.8910),
+    ("honolulu", "HI"): (21.3069, -157.8583),
+    ("anchorage", "AK"): (61.2181, -149.9003),
+    ("newark", "NJ"): (40.7357, -74.1724),
+    ("jersey city", "NJ"): (40.7178, -74.0431),
+    ("providence", "RI"): (41.8240, -71.4128),
+    ("hartford", "CT"): (41.7658, -72.6734),
+    ("birmingham", "AL"): (33.5186, -86.8104),
+    ("charleston", "SC"): (32.7765, -79.9311),
+    ("boise", "ID"): (43.6150, -116.2023),
+    ("des moines", "IA"): (41.5868, -93.6250),
+    ("little rock", "AR"): (34.7465, -92.2896)
+}
+
+
+def split_location(location: str) -> Tuple[str, Optional[str]]:
+    """Split "City, ST" / "City, State" into (lower-cased city, state code or None)"""
+    city, _, state = location.partition(",")
+    city = " ".join(city.lower().split())
+    state = state.strip()
+    if not state:
+        return city, None
+    if state.upper() in US_STATES:
+        return city, state.upper()
+    return city, STATE_CODES.get(state.lower())
+
+
+def geocode(location: Optional[str]) -> Optional[dict]:
+    """GeoJSON point for a free-text location, or None if it is not in the gazetteer"""
+    if not location:
+        return None
+    city, state = split_location(location)
+    coordinates = CITY_GAZETTEER.get((city, state)) if state else None
+    if coordinates is None and not state:
+        # Bare city names resolve to the first gazetteer entry with that name
+        coordinates = next((coords for (name, _), coords in CITY_GAZETTEER.items() if name == city), None)
+    if coordinates is None:
+        return None
+    latitude, longitude = coordinates
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def location_tokens(location: str) -> list:
+    """Lower-cased alphanumeric words of a location, e.g. "St. Louis, MO" -> ["st", "louis", "mo"]"""
+    return re.findall(r"[a-z0-9]+", location.lower())
+
+
+def normalize_location(location: Optional[str]) -> dict:
+    """Structured, lower-cased location fields stored next to the free-text location"""
+    if not location:
+        return {"location_city": None, "location_state": None, "location_tokens": []}
+    city, state = split_location(location)
+    tokens = location_tokens(location)
+    if state and state.lower() not in tokens:
+        tokens.append(state.lower())
+    return {
+        "location_city": city or None,
+        "location_state": state.lower() if state else None,
+        "location_tokens": tokens
+    }
+
+
+def location_filter(location: str) -> Optional[dict]:
+    """Index-friendly filter for a user-typed location.
+
+    "City, ST" (or a full state name) is an equality lookup on the normalized
+    city/state. Anything else matches stored location tokens: every typed word
+    must be a whole token except the last, which may be a prefix. Prefix
+    patterns are anchored and escaped, so they become index bounds and cannot
+    be abused as arbitrary regular expressions.
+    """
+    city, state = split_location(location)
+    if city and state:
+        return {"location_city": city, "location_state": state.lower()}
+    tokens = location_tokens(location)
+    if not tokens:
+        return None
+    clauses = [{"location_tokens": token} for token in tokens[:-1]]
+    clauses.append({"location_tokens": {"$regex": f"^{re.escape(tokens[-1])}"}})
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
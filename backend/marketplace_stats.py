@@ -0,0 +1,161 @@
+"""Rollup counters behind the public marketplace summary (`/api/stats`).
+
+Every counter is a small document in the `marketplace_stats` collection keyed
+by what it counts, e.g. `{"_id": {"metric": "requests", "status": "open",
+"category": "Home Services"}, "count": 12, "accepted_bid_value": 0}`. Write
+endpoints adjust them with `$inc` upserts so reading the summary is a scan of
+a few dozen tiny documents instead of the requests, bids and providers
+collections. `reconcile()` recomputes everything from the source collections
+and is run at startup and periodically to correct any drift.
+"""
+from datetime import datetime
+from typing import Optional
+
+from pymongo import DeleteMany, ReplaceOne
+
+REQUESTS = "requests"
+BIDS = "bids"
+PROVIDERS = "providers"
+
+
+def request_key(status: str, category: str) -> dict:
+    return {"metric": REQUESTS, "status": status, "category": category}
+
+
+class MarketplaceStats:
+    def __init__(self, database, collection_name: str = "marketplace_stats"):
+        self.database = database
+        self.counters = database[collection_name]
+
+    async def _inc(self, key: dict, **amounts):
+        await self.counters.update_one({"_id": key}, {"$inc": amounts}, upsert=True)
+
+    async def record_request_created(self, request: dict):
+        await self._inc(request_key(request["status"], request["category"]), count=1)
+
+    async def record_request_deleted(self, request: dict, accepted_bid_value: float = 0.0):
+        await self._inc(
+            request_key(request["status"], request["category"]),
+            count=-1, accepted_bid_value=-accepted_bid_value
+        )
+        if request.get("bid_count"):
+            await self._inc(
+                {"metric": BIDS},
+                count=-request["bid_count"], price_sum=-request.get("bid_price_sum", 0.0)
+            )
+
+    async def record_request_moved(self, old_key: dict, new_key: dict, accepted_bid_value: float = 0.0):
+        """A request changed status and/or category, carrying its accepted bid value along"""
+        if old_key == new_key:
+            return
+        await self._inc(old_key, count=-1, accepted_bid_value=-accepted_bid_value)
+        await self._inc(new_key, count=1, accepted_bid_value=accepted_bid_value)
+
+    async def record_bid_accepted(self, request: dict, new_status: str, price: float):
+        await self._inc(request_key(request["status"], request["category"]), count=-1)
+        await self._inc(request_key(new_status, request["category"]), count=1, accepted_bid_value=price)
+
+    async def record_bid_created(self, price: float):
+        await self._inc({"metric": BIDS}, count=1, price_sum=price)
+
+    async def accepted_bid_value(self, request_id: str) -> float:
+        bid = await self.database.bids.find_one(
+            {"service_request_id": request_id, "status": "accepted"},
+            {"_id": 0, "price": 1}
+        )
+        return bid["price"] if bid else 0.0
+
+    async def reconcile(self) -> int:
+        """Recompute every counter from the source collections; returns the number of counters.
+
+        Increments landing while the aggregations run may be overwritten;
+        the next reconciliation picks them up again.
+        """
+        counters = []
+        async for group in self.database.service_requests.aggregate([
+            {"$lookup": {
+                "from": "bids",
+                "let": {"request_id": "$id"},
+                "pipeline": [
+                    {"$match": {"$expr": {"$and": [
+                        {"$eq": ["$service_request_id", "$$request_id"]},
+                        {"$eq": ["$status", "accepted"]}
+                    ]}}},
+                    {"$project": {"_id": 0, "price": 1}}
+                ],
+                "as": "accepted_bids"
+            }},
+            {"$group": {
+                "_id": {"status": "$status", "category": "$category"},
+                "count": {"$sum": 1},
+                "accepted_bid_value": {"$sum": {"$sum": "$accepted_bids.price"}}
+            }}
+        ]):
+            counters.append({
+                "_id": request_key(group["_id"]["status"], group["_id"]["category"]),
+                "count": group["count"],
+                "accepted_bid_value": group["accepted_bid_value"]
+            })
+        async for group in self.database.bids.aggregate([
+            {"$group": {"_id": None, "count": {"$sum": 1}, "price_sum": {"$sum": "$price"}}}
+        ]):
+            counters.append({"_id": {"metric": BIDS}, "count": group["count"], "price_sum": group["price_sum"]})
+        async for group in self.database.service_providers.aggregate([
+            {"$group": {"_id": {"$eq": ["$verified", True]}, "count": {"$sum": 1}}}
+        ]):
+            counters.append({"_id": {"metric": PROVIDERS, "verified": group["_id"]}, "count": group["count"]})
+
+        reconciled_at = datetime.utcnow()
+        operations = [
+            ReplaceOne({"_id": counter["_id"]}, {**counter, "reconciled_at": reconciled_at}, upsert=True)
+            for counter in counters
+        ]
+        # Buckets that no longer exist in the source collections
+        operations.append(DeleteMany({"reconciled_at": {"$ne": reconciled_at}}))
+        await self.counters.bulk_write(operations, ordered=True)
+        return len(counters)
+
+    async def summary(self) -> dict:
+        by_status, by_category, open_by_category = {}, {}, {}
+        completed_value = 0.0
+        bids = {"count": 0, "price_sum": 0.0}
+        providers = verified_providers = 0
+        reconciled_at: Optional[datetime] = None
+
+        async for counter in self.counters.find({}):
+            key = counter["_id"]
+            if counter.get("reconciled_at") and (reconciled_at is None or counter["reconciled_at"] > reconciled_at):
+                reconciled_at = counter["reconciled_at"]
+            if key["metric"] == REQUESTS:
+                count = counter.get("count", 0)
+                if count <= 0:
+                    continue
+                status, category = key["status"], key["category"]
+                by_status[status] = by_status.get(status, 0) + count
+                by_category[category] = by_category.get(category, 0) + count
+                if status == "open":
+                    open_by_category[category] = open_by_category.get(category, 0) + count
+                if status == "completed":
+                    completed_value += counter.get("accepted_bid_value", 0.0)
+            elif key["metric"] == BIDS:
+                bids = counter
+            elif key["metric"] == PROVIDERS:
+                providers += counter.get("count", 0)
+                if key["verified"]:
+                    verified_providers += counter.get("count", 0)
+
+        bid_count = bids.get("count", 0)
+        return {
+            "total_requests": sum(by_status.values()),
+            "open_requests": by_status.get("open", 0),
+            "requests_by_status": by_status,
+            "requests_by_category": by_category,
+            "open_requests_by_category": open_by_category,
+            "completed_projects": by_status.get("completed", 0),
+            "completed_project_value": round(completed_value, 2),
+            "total_providers": providers,
+            "verified_providers": verified_providers,
+            "total_bids": bid_count,
+            "average_bid_price": round(bids.get("price_sum", 0.0) / bid_count, 2) if bid_count > 0 else None,
+            "reconciled_at": reconciled_at.isoformat() if reconciled_at else None
+        }
@@ -0,0 +1,92 @@
+"""bcrypt hashing and verification in a bounded worker pool.
+
+A bcrypt operation takes a few hundred milliseconds of CPU. Run inline it
+would block the event loop and every other request with it, so operations
+run in a small thread pool instead (bcrypt releases the GIL while hashing).
+When too many operations are already waiting, new ones are rejected with
+PasswordHasherBusy rather than queueing without bound.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def percentile(samples, fraction: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class PasswordHasher:
+    def __init__(self, rounds: int, workers: int, max_pending: int, samples: int = 1000):
+        # Hashes made with any other cost are flagged for a rehash on the next login
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds
+        )
+        self.rounds = rounds
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hashing")
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+        self.wait_ms = deque(maxlen=samples)
+        self.run_ms = deque(maxlen=samples)
+
+    async def _run(self, function, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations in progress, try again shortly")
+        self.pending += 1
+        queued_at = time.perf_counter()
+
+        def timed():
+            started_at = time.perf_counter()
+            try:
+                return function(*args)
+            finally:
+                self.wait_ms.append((started_at - queued_at) * 1000)
+                self.run_ms.append((time.perf_counter() - started_at) * 1000)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, timed)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+        """(valid, new_hash); new_hash is set when the stored hash uses an outdated cost"""
+        valid, new_hash = await self._run(self.context.verify_and_update, password, password_hash)
+        if new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def stats(self) -> dict:
+        return {
+            "rounds": self.rounds,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "wait_ms": {"p50": percentile(self.wait_ms, 0.5), "p95": percentile(self.wait_ms, 0.95)},
+            "run_ms": {"p50": percentile(self.run_ms, 0.5), "p95": percentile(self.run_ms, 0.95)}
+        }
@@ -0,0 +1,168 @@
+"""MongoDB filter construction for service request listings.
+
+Kept free of database and web framework imports so the generated queries can
+be unit tested on their own.
+"""
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from locations import location_filter
+
+# Urgency by days until the deadline, most urgent first; later or undated
+# deadlines are "flexible". Filtering, sorting and the displayed label all
+# derive from this one table so they cannot disagree.
+URGENCY_THRESHOLDS = [("urgent", 3), ("moderate", 14)]
+URGENCY_LEVELS = [level for level, _ in URGENCY_THRESHOLDS] + ["flexible"]
+FAR_FUTURE = datetime(9999, 12, 31)
+
+
+class FilterBuilder:
+    """Collects filter clauses and combines them without letting one clobber another.
+
+    Clauses touching different keys are merged into a single document; any
+    clause that would overwrite an existing key (two `$or`s, two predicates on
+    `deadline`, ...) is kept intact under `$and` instead.
+    """
+
+    def __init__(self):
+        self.clauses: List[dict] = []
+
+    def add(self, clause: Optional[dict]) -> "FilterBuilder":
+        if clause:
+            self.clauses.append(clause)
+        return self
+
+    def build(self) -> dict:
+        merged = {}
+        conflicting = []
+        for clause in self.clauses:
+            if merged.keys() & clause.keys():
+                conflicting.append(clause)
+            else:
+                merged.update(clause)
+        if conflicting:
+            return {"$and": [merged] + conflicting}
+        return merged
+
+
+def first_given(*values):
+    """First value that is not None, so an explicit 0 is not mistaken for a missing alias"""
+    for value in values:
+        if value is not None:
+            return value
+    return None
+
+
+def parse_iso_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace('Z', '+00:00'))
+
+
+def budget_overlap_filter(budget_min: Optional[float], budget_max: Optional[float]) -> Optional[dict]:
+    """Requests whose [budget_min, budget_max] range overlaps the wanted range.
+
+    Both bounds land on the fields of the (budget_min, budget_max) compound
+    index, so the planner can turn them into index bounds.
+    """
+    clause = {}
+    if budget_max is not None:
+        clause["budget_min"] = {"$lte": budget_max}
+    if budget_min is not None:
+        clause["budget_max"] = {"$gte": budget_min}
+    return clause or None
+
+
+def urgency_bounds(now: datetime) -> List[tuple]:
+    """(level, latest deadline) pairs for URGENCY_THRESHOLDS as of `now`"""
+    return [(level, now + timedelta(days=days)) for level, days in URGENCY_THRESHOLDS]
+
+
+def urgency_filter(urgency: str, now: datetime) -> dict:
+    """Deadline range predicate selecting one urgency level, servable by the deadline index"""
+    lower = None
+    for level, bound in urgency_bounds(now):
+        if level == urgency:
+            deadline_range = {"$lte": bound}
+            if lower is not None:
+                deadline_range["$gt"] = lower
+            return {"deadline": deadline_range}
+        lower = bound
+    return {"$or": [{"deadline": {"$gt": lower}}, {"deadline": None}]}
+
+
+def urgency_level_expression(now: datetime) -> dict:
+    """Aggregation expression labelling a request with its urgency level as of `now`"""
+    return {"$switch": {
+        "branches": [
+            {
+                "case": {"$and": [
+                    {"$eq": [{"$type": "$deadline"}, "date"]},
+                    {"$lte": ["$deadline", bound]}
+                ]},
+                "then": level
+            }
+            for level, bound in urgency_bounds(now)
+        ],
+        "default": "flexible"
+    }}
+
+
+def build_service_request_filter(
+    *,
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    budget_min: Optional[float] = None,
+    budget_max: Optional[float] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    deadline_before: Optional[str] = None,
+    deadline_after: Optional[str] = None,
+    search: Optional[str] = None,
+    urgency: Optional[str] = None,
+    has_images: Optional[bool] = None,
+    show_best_bids_only: Optional[bool] = None,
+    now: Optional[datetime] = None
+) -> dict:
+    """Translate listing query parameters into a MongoDB filter.
+
+    Raises ValueError for a malformed deadline_before/deadline_after.
+    """
+    now = now or datetime.utcnow()
+    builder = FilterBuilder()
+
+    if category:
+        builder.add({"category": category})
+    if subcategory:
+        builder.add({"subcategory": subcategory})
+    if status:
+        builder.add({"status": status})
+
+    if location:
+        builder.add(location_filter(location))
+
+    # budget_min/budget_max are the documented names, min_budget/max_budget legacy aliases
+    builder.add(budget_overlap_filter(
+        first_given(budget_min, min_budget),
+        first_given(budget_max, max_budget)
+    ))
+
+    if deadline_before:
+        builder.add({"deadline": {"$lt": parse_iso_datetime(deadline_before)}})
+    if deadline_after:
+        builder.add({"deadline": {"$gt": parse_iso_datetime(deadline_after)}})
+
+    if search:
+        builder.add({"$text": {"$search": search}})
+
+    if urgency in URGENCY_LEVELS:
+        builder.add(urgency_filter(urgency, now))
+
+    # images.0 exists exactly when the array is present and non-empty
+    if has_images is not None:
+        builder.add({"images.0": {"$exists": has_images}})
+
+    if show_best_bids_only:
+        builder.add({"show_best_bids": True})
+
+    return builder.build()
@@ -0,0 +1,67 @@
+"""JSON encoding of MongoDB documents.
+
+`MongoJSONResponse` encodes documents with orjson in one pass, handling
+datetimes and ObjectIds natively. That avoids copying each document through
+`serialize_mongo_doc` and then having FastAPI walk it again with
+`jsonable_encoder` and response-model validation.
+"""
+from datetime import datetime
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import Response
+
+
+def serialize_mongo_doc(doc):
+    """Convert MongoDB document to JSON serializable format"""
+    if doc is None:
+        return None
+    if isinstance(doc, list):
+        return [serialize_mongo_doc(item) for item in doc]
+    if isinstance(doc, dict):
+        result = {}
+        for key, value in doc.items():
+            if key == '_id':
+                continue  # Skip MongoDB's _id field
+            elif isinstance(value, ObjectId):
+                result[key] = str(value)
+            elif isinstance(value, datetime):
+                result[key] = value.isoformat()
+            elif isinstance(value, dict):
+                result[key] = serialize_mongo_doc(value)
+            elif isinstance(value, list):
+                result[key] = serialize_mongo_doc(value)
+            else:
+                result[key] = value
+        return result
+    return doc
+
+
+def encode_default(value):
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def strip_mongo_ids(content):
+    """Drop `_id` from a document and every document nested in it, in place"""
+    if isinstance(content, dict):
+        content.pop("_id", None)
+        for value in content.values():
+            strip_mongo_ids(value)
+    elif isinstance(content, list):
+        for item in content:
+            strip_mongo_ids(item)
+    return content
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=encode_default)
+
+
+class MongoJSONResponse(Response):
+    """JSON response for raw MongoDB documents (or lists of them)"""
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        return dumps(strip_mongo_ids(content))
@@ -1,9 +1,12 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Response, Header, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateMany, UpdateOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
 import os
 import logging
 from pathlib import Path
@@ -12,12 +15,33 @@ from typing import List, Optional, Dict, Any
 import uuid
 from datetime import datetime, timedelta
 import jwt
-from passlib.context import CryptContext
 import shutil
-from bson import ObjectId
-import json
+import re
+import copy
 import asyncio
 from emergentintegrations.llm.chat import LlmChat, UserMessage
+from query_builder import (
+    FAR_FUTURE, FilterBuilder, build_service_request_filter, first_given, urgency_level_expression
+)
+from locations import geocode, location_filter, normalize_location
+from marketplace_stats import MarketplaceStats, request_key
+from bid_stats import BID_STAT_FIELDS, BID_STATS_GROUP, bid_stats_increment, bid_stats_repair, bid_stats_summary
+from bid_acceptance import BidAcceptanceError, finish_pending_acceptances, perform_bid_acceptance
+from cursors import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+from cache import MemoryCacheBackend, ResponseCache, TTLCache
+from coalescing import SingleFlight
+from dataloader import DataLoader
+from password_hashing import PasswordHasher, PasswordHasherBusy
+from responses import MongoJSONResponse, dumps, serialize_mongo_doc, strip_mongo_ids
+from exports import (
+    BID_EXPORT_COLUMNS, EXPORT_BATCH_SIZE, EXPORT_FORMATS, PROVIDER_EXPORT_COLUMNS,
+    SERVICE_REQUEST_EXPORT_COLUMNS, csv_lines, export_projection, ndjson_lines
+)
+from image_store import (
+    ImageStore, ImageTooLarge, CHUNK_SIZE as IMAGE_CHUNK_SIZE, IMAGE_URL_PREFIX, IMAGE_VARIANTS,
+    UnsupportedImageType, content_safety_headers, detect_content_type, image_url, is_data_url,
+    migrate_inline_images, parse_byte_range, parse_data_url, placeholder_data_url, variant_name
+)
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -26,13 +50,19 @@ load_dotenv(ROOT_DIR / '.env')
 mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
+image_store = ImageStore(db)
+marketplace_stats = MarketplaceStats(db)
 
 # Security
 SECRET_KEY = "your-secret-key-change-in-production"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30 * 24 * 60  # 30 days
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+    max_pending=int(os.environ.get('PASSWORD_HASH_MAX_PENDING', '32'))
+)
 security = HTTPBearer()
 
 # Create the main app without a prefix
@@ -122,6 +152,45 @@ SERVICE_SUBCATEGORIES = {
     ]
 }
 
+# Case-insensitive lookup of the canonical subcategory spelling
+SUBCATEGORY_NAMES = {
+    subcategory.lower(): subcategory
+    for subcategories in SERVICE_SUBCATEGORIES.values()
+    for subcategory in subcategories
+}
+SUBCATEGORY_IGNORED_WORDS = {"services", "service", "&", "and"}
+
+def keyword_matches(word: str, tokens: set) -> bool:
+    """Whether a subcategory keyword occurs among the words of a text"""
+    if len(word) < 5:
+        # Too short to stem: "car" must not match "care" or "scar"
+        return word in tokens or f"{word}s" in tokens
+    # Compare on a short stem so "Plumbing" also catches "plumber"
+    return any(token[:5] == word[:5] for token in tokens)
+
+def infer_subcategory(category: str, title: str, description: str) -> Optional[str]:
+    """Best keyword match among the category's subcategories, or None"""
+    tokens = set(re.findall(r"[a-z0-9]+", f"{title} {description}".lower()))
+    best, best_score = None, 0
+    for subcategory in SERVICE_SUBCATEGORIES.get(category, []):
+        words = [
+            word for word in re.findall(r"[a-z0-9]+", subcategory.lower())
+            if word not in SUBCATEGORY_IGNORED_WORDS
+        ]
+        score = sum(1 for word in words if keyword_matches(word, tokens))
+        if score > best_score:
+            best, best_score = subcategory, score
+    return best
+
+def resolve_subcategory(category: str, subcategory: Optional[str], title: str, description: str) -> Optional[str]:
+    """Validate a client-supplied subcategory, or infer one when none was given"""
+    if not subcategory:
+        return infer_subcategory(category, title, description)
+    canonical = SUBCATEGORY_NAMES.get(subcategory.lower())
+    if canonical not in SERVICE_SUBCATEGORIES.get(category, []):
+        raise HTTPException(status_code=400, detail=f"Invalid subcategory for {category}")
+    return canonical
+
 # Models
 class UserRole:
     CUSTOMER = "customer"
@@ -150,6 +219,11 @@ class UserCreate(BaseModel):
 class UserRoleUpdate(BaseModel):
     roles: List[str]
 
+class UserProfileUpdate(BaseModel):
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+
 class UserLogin(BaseModel):
     email: EmailStr
     password: str
@@ -182,16 +256,30 @@ class ProviderProfileCreate(BaseModel):
 class ServiceRequest(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     user_id: str
+    user_name: Optional[str] = None  # Denormalized from the owner, kept in sync on name changes
     title: str
     description: str
     category: str
     budget_min: Optional[float] = None
     budget_max: Optional[float] = None
     deadline: Optional[datetime] = None
+    # Sort key for sort_by=urgency: the deadline, or FAR_FUTURE when there is none
+    urgency_deadline: Optional[datetime] = None
     location: Optional[str] = None
+    subcategory: Optional[str] = None
+    geo: Optional[Dict[str, Any]] = None  # GeoJSON point geocoded from location
+    # Lower-cased city/state and words of location, for indexed location filters
+    location_city: Optional[str] = None
+    location_state: Optional[str] = None
+    location_tokens: List[str] = []
     images: List[str] = []  # Base64 encoded images or image URLs
     status: str = "open"  # open, in_progress, completed, cancelled
     show_best_bids: bool = False
+    # Denormalized bid statistics, maintained by the bid endpoints
+    bid_count: int = 0
+    bid_price_sum: float = 0.0
+    min_bid_price: Optional[float] = None
+    max_bid_price: Optional[float] = None
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -203,6 +291,7 @@ class ServiceRequestCreate(BaseModel):
     budget_max: Optional[float] = None
     deadline: Optional[datetime] = None
     location: Optional[str] = None
+    subcategory: Optional[str] = None  # Inferred from title/description when omitted
     images: List[str] = []  # Base64 encoded images
     show_best_bids: bool = False
 
@@ -232,6 +321,7 @@ class BidMessage(BaseModel):
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     bid_id: str
     sender_id: str
+    sender_name: Optional[str] = None  # Denormalized from the sender, kept in sync on name changes
     sender_role: str
     message: str
     created_at: datetime = Field(default_factory=datetime.utcnow)
@@ -354,38 +444,46 @@ class ServiceProvider(BaseModel):
     google_reviews_count: int = 0
     website_rating: float = 0.0
     verified: bool = False
+    location_city: Optional[str] = None
+    location_state: Optional[str] = None
+    location_tokens: List[str] = []
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 # Utility functions
-def serialize_mongo_doc(doc):
-    """Convert MongoDB document to JSON serializable format"""
-    if doc is None:
-        return None
-    if isinstance(doc, list):
-        return [serialize_mongo_doc(item) for item in doc]
-    if isinstance(doc, dict):
-        result = {}
-        for key, value in doc.items():
-            if key == '_id':
-                continue  # Skip MongoDB's _id field
-            elif isinstance(value, ObjectId):
-                result[key] = str(value)
-            elif isinstance(value, datetime):
-                result[key] = value.isoformat()
-            elif isinstance(value, dict):
-                result[key] = serialize_mongo_doc(value)
-            elif isinstance(value, list):
-                result[key] = serialize_mongo_doc(value)
-            else:
-                result[key] = value
-        return result
-    return doc
+def cursor_filter(cursor: str, sort_field: str, sort_direction: int) -> dict:
+    """Keyset predicate for the page after `cursor`; 400 if it is malformed or from another sort"""
+    try:
+        after_value, after_id = decode_cursor(cursor, sort_field, sort_direction)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return keyset_filter(sort_field, sort_direction, after_value, after_id)
+
+# Computed in place of the inline images for list views: how many there are,
+# and a thumbnail URL when the first one is already in the image store
+IMAGE_SUMMARY_FIELDS = {
+    "image_count": {"$size": {"$ifNull": ["$images", []]}},
+    "thumbnail_url": {"$let": {
+        "vars": {"first": {"$arrayElemAt": ["$images", 0]}},
+        "in": {"$cond": [
+            {"$eq": [{"$indexOfBytes": [{"$ifNull": ["$$first", ""]}, IMAGE_URL_PREFIX]}, 0]},
+            {"$concat": ["$$first", "?variant=thumb"]},
+            None
+        ]}
+    }}
+}
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def get_password_hash(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def verify_password(plain_password: str, hashed_password: str):
+    """(valid, new_hash); new_hash replaces a hash made with an outdated bcrypt cost"""
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -397,6 +495,17 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+# Resolved users by id. Every user mutation calls invalidate_current_user; the
+# TTL bounds staleness for writes made by other server processes.
+USER_CACHE_SECONDS = float(os.environ.get('USER_CACHE_SECONDS', '60'))
+current_user_cache = TTLCache(maxsize=10000, ttl=USER_CACHE_SECONDS)
+
+def invalidate_current_user(user_id: Optional[str] = None):
+    if user_id is None:
+        current_user_cache.clear()
+    else:
+        current_user_cache.delete(user_id)
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     try:
         token = credentials.credentials
@@ -407,10 +516,44 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except jwt.PyJWTError:
         raise HTTPException(status_code=401, detail="Invalid authentication credentials")
     
-    user = await db.users.find_one({"id": user_id})
+    user = current_user_cache.get(user_id)
     if user is None:
-        raise HTTPException(status_code=401, detail="User not found")
-    return serialize_mongo_doc(user)
+        user = await db.users.find_one({"id": user_id}, {"_id": 0, "password_hash": 0})
+        if user is None:
+            raise HTTPException(status_code=401, detail="User not found")
+        user = serialize_mongo_doc(user)
+        current_user_cache.set(user_id, user)
+    # Handlers modify the user they receive (e.g. appending to roles)
+    return copy.deepcopy(user)
+
+# Roles a user may give themselves at registration or via /user/roles;
+# "admin" is only ever granted directly in the database
+SELF_ASSIGNABLE_ROLES = ["customer", "provider"]
+
+async def get_admin_user(current_user: dict = Depends(get_current_user)) -> dict:
+    if "admin" not in current_user.get("roles", []):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
+
+def collection_loader(collection, projection: Optional[dict] = None) -> DataLoader:
+    """Batch `id` lookups on `collection` into one $in query per tick"""
+    async def batch_load(ids):
+        docs = await collection.find({"id": {"$in": ids}}, projection or {"_id": 0}).to_list(len(ids))
+        return {doc["id"]: doc for doc in docs}
+    return DataLoader(batch_load)
+
+class Loaders:
+    """Per-request batching loaders, see dataloader.py"""
+    def __init__(self):
+        self.users = collection_loader(db.users, {"_id": 0, "id": 1, "first_name": 1, "last_name": 1})
+        self.service_requests = collection_loader(db.service_requests)
+        self.bids = collection_loader(db.bids)
+
+def get_loaders() -> Loaders:
+    return Loaders()
+
+def display_name(user: Optional[dict]) -> Optional[str]:
+    return f"{user['first_name']} {user['last_name']}" if user else None
 
 # Routes
 @api_router.get("/")
@@ -434,16 +577,24 @@ async def get_all_subcategories():
     """Get all categories and their subcategories"""
     return SERVICE_SUBCATEGORIES
 
+@api_router.get("/stats")
+async def get_marketplace_stats():
+    """Marketplace totals from the incrementally maintained rollups"""
+    return await marketplace_stats.summary()
+
 # Authentication Routes
 @api_router.post("/auth/register", response_model=Dict[str, Any])
 async def register(user_data: UserCreate):
+    if user_data.role not in SELF_ASSIGNABLE_ROLES:
+        raise HTTPException(status_code=400, detail="Invalid role")
+    
     # Check if user already exists
     existing_user = await db.users.find_one({"email": user_data.email})
     if existing_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
     # Hash password and create user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     user = User(
         email=user_data.email,
         phone=user_data.phone,
@@ -473,8 +624,17 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login", response_model=Token)
 async def login(user_credentials: UserLogin):
     user = await db.users.find_one({"email": user_credentials.email})
-    if not user or not verify_password(user_credentials.password, user["password_hash"]):
+    if not user:
+        raise HTTPException(status_code=401, detail="Incorrect email or password")
+    valid, new_hash = await verify_password(user_credentials.password, user["password_hash"])
+    if not valid:
         raise HTTPException(status_code=401, detail="Incorrect email or password")
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made
+        await db.users.update_one(
+            {"id": user["id"], "password_hash": user["password_hash"]},
+            {"$set": {"password_hash": new_hash}}
+        )
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -495,17 +655,70 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
     current_user.pop("password_hash", None)
     return serialize_mongo_doc(current_user)
 
+def derive_request_fields(service_request: ServiceRequest):
+    """Fill the fields stored alongside a new request that are computed from its other fields"""
+    service_request.subcategory = resolve_subcategory(
+        service_request.category, service_request.subcategory,
+        service_request.title, service_request.description
+    )
+    service_request.geo = geocode(service_request.location)
+    for field, value in normalize_location(service_request.location).items():
+        setattr(service_request, field, value)
+    service_request.urgency_deadline = service_request.deadline or FAR_FUTURE
+
 # Service Request Routes
 @api_router.post("/service-requests", response_model=ServiceRequest)
 async def create_service_request(request_data: ServiceRequestCreate, current_user: dict = Depends(get_current_user)):
     if "customer" not in current_user.get("roles", []):
         raise HTTPException(status_code=403, detail="Only customers can create service requests")
     
-    service_request = ServiceRequest(**request_data.dict(), user_id=current_user["id"])
+    service_request = ServiceRequest(
+        **request_data.dict(), user_id=current_user["id"], user_name=display_name(current_user)
+    )
+    derive_request_fields(service_request)
+    service_request.images = await store_request_images(service_request.images)
     await db.service_requests.insert_one(service_request.dict())
+    await marketplace_stats.record_request_created(service_request.dict())
+    await invalidate_listing_cache()
     return service_request
 
-@api_router.get("/service-requests", response_model=List[Dict[str, Any]])
+SERVICE_REQUEST_SORT_FIELDS = ["created_at", "budget_min", "budget_max", "deadline", "title", "bid_count", "min_bid_price"]
+
+# Totals and facet counts per filter set; briefly stale counts are fine for a sidebar
+LISTING_FACET_CACHE_SECONDS = 30
+listing_facet_cache = TTLCache(maxsize=256, ttl=LISTING_FACET_CACHE_SECONDS)
+
+# Whole listing responses, invalidated by any write to the collections they read
+LISTING_CACHE_SECONDS = float(os.environ.get('LISTING_CACHE_SECONDS', '10'))
+LISTING_CACHE_DEPENDS_ON = ("service_requests", "bids")
+LISTING_CACHE_MAX_BYTES = int(os.environ.get('LISTING_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+response_cache = ResponseCache(
+    MemoryCacheBackend(maxsize=1024, maxbytes=LISTING_CACHE_MAX_BYTES), ttl=LISTING_CACHE_SECONDS
+)
+
+# Identical concurrent reads share one database execution
+listing_flight = SingleFlight("service-requests")
+listing_facets_flight = SingleFlight("service-request-facets")
+providers_flight = SingleFlight("service-providers")
+provider_flight = SingleFlight("service-provider")
+
+async def invalidate_listing_cache():
+    await response_cache.invalidate(*LISTING_CACHE_DEPENDS_ON)
+
+# sort_by=urgency (descending) lists the nearest deadline first and undated
+# requests last: an ascending sort on the stored urgency_deadline
+URGENCY_SORT_FIELD = "urgency_deadline"
+
+def service_request_filter(now: datetime, subcategory: Optional[str] = None, **params) -> dict:
+    """Listing filter with subcategory aliases resolved; malformed input is a 400"""
+    if subcategory:
+        subcategory = SUBCATEGORY_NAMES.get(subcategory.lower(), subcategory)
+    try:
+        return build_service_request_filter(subcategory=subcategory, now=now, **params)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid deadline format")
+
+@api_router.get("/service-requests")
 async def get_service_requests(
     category: Optional[str] = None, 
     subcategory: Optional[str] = None,
@@ -520,94 +733,107 @@ async def get_service_requests(
     sort_order: Optional[str] = "desc",
     limit: Optional[int] = 20,  # Reduced default limit for better performance
     page: Optional[int] = 1,    # Added pagination
+    cursor: Optional[str] = None,  # Keyset pagination, takes precedence over page
+    include_images: Optional[bool] = False,  # Ship full inline images (detail views)
     urgency: Optional[str] = None,
     has_images: Optional[bool] = None,
     show_best_bids_only: Optional[bool] = None,
     min_budget: Optional[float] = None,
     max_budget: Optional[float] = None,
-    distance_km: Optional[float] = None,
-    latitude: Optional[float] = None,
-    longitude: Optional[float] = None
+    distance_km: Optional[float] = Query(None, gt=0),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    envelope: Optional[bool] = False
 ):
     """
     Get service requests with optimized performance and pagination
-    """
-    filter_dict = {}
-    
-    # Basic filters
-    if category:
-        filter_dict["category"] = category
-    if status:
-        filter_dict["status"] = status
-    
-    # Location filter (case-insensitive partial match)
-    if location:
-        filter_dict["location"] = {"$regex": location, "$options": "i"}
-    
-    # Enhanced budget filters
-    budget_filter = {}
-    min_bud = budget_min or min_budget
-    max_bud = budget_max or max_budget
-    
-    if min_bud is not None:
-        budget_filter["$gte"] = min_bud
-    if max_bud is not None:
-        budget_filter["$lte"] = max_bud
-    
-    if budget_filter:
-        filter_dict["$or"] = [
-            {"budget_min": budget_filter},
-            {"budget_max": budget_filter}
-        ]
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page; unlike `page`, its cost does not grow with page depth.
     
-    # Search filter (simplified for performance)
-    if search:
-        filter_dict["$text"] = {"$search": search}
-    
-    # Urgency filter (simplified)
-    if urgency == "urgent":
-        now = datetime.utcnow()
-        urgent_deadline = now + timedelta(days=7)
-        filter_dict["deadline"] = {"$lte": urgent_deadline, "$ne": None}
-    elif urgency == "flexible":
-        now = datetime.utcnow()
-        flexible_deadline = now + timedelta(days=30)
-        filter_dict["$or"] = [
-            {"deadline": {"$gte": flexible_deadline}},
-            {"deadline": None}
-        ]
+    With `latitude`/`longitude`, results are limited to `distance_km` (if
+    given), carry their `distance_km`, and can be sorted nearest first with
+    `sort_by=distance`.
     
-    # Images filter
-    if has_images is not None:
-        if has_images:
-            filter_dict["images"] = {"$ne": [], "$exists": True}
-        else:
-            filter_dict["$or"] = [
-                {"images": {"$eq": []}},
-                {"images": {"$exists": False}}
-            ]
+    With `envelope=true` the response is `{items, total, total_is_estimate,
+    facets, next_cursor}`, where facets count the matching requests per
+    category, status and urgency level.
+    """
+    now = datetime.utcnow()
+    filter_dict = service_request_filter(
+        now,
+        category=category,
+        subcategory=subcategory,
+        status=status,
+        location=location,
+        budget_min=budget_min,
+        budget_max=budget_max,
+        min_budget=min_budget,
+        max_budget=max_budget,
+        deadline_before=deadline_before,
+        deadline_after=deadline_after,
+        search=search,
+        urgency=urgency,
+        has_images=has_images,
+        show_best_bids_only=show_best_bids_only
+    )
     
-    # Show best bids filter
-    if show_best_bids_only:
-        filter_dict["show_best_bids"] = True
+    near_point = None
+    if latitude is not None and longitude is not None:
+        if search:
+            raise HTTPException(status_code=400, detail="search cannot be combined with a latitude/longitude radius")
+        near_point = {"type": "Point", "coordinates": [longitude, latitude]}
     
     # Sort configuration
-    valid_sort_fields = ["created_at", "budget_min", "budget_max", "deadline", "title"]
+    valid_sort_fields = SERVICE_REQUEST_SORT_FIELDS + ["urgency"]
+    if near_point:
+        valid_sort_fields.append("distance")
     sort_field = sort_by if sort_by in valid_sort_fields else "created_at"
     sort_direction = -1 if sort_order == "desc" else 1
+    if sort_field == "distance":
+        sort_direction = 1  # Nearest first
+    elif sort_field == "urgency":
+        sort_field, sort_direction = URGENCY_SORT_FIELD, -sort_direction
+    # Sort keys that are not part of the response are kept for the cursor, then dropped
+    cursor_only_field = sort_field in (URGENCY_SORT_FIELD, "distance")
+    
+    if near_point:
+        # $geoNear must lead the pipeline; it applies the filter itself via the 2dsphere index
+        geo_near = {
+            "near": near_point,
+            "distanceField": "distance",
+            "key": "geo",
+            "spherical": True,
+            "query": filter_dict
+        }
+        if distance_km is not None:
+            geo_near["maxDistance"] = distance_km * 1000
+        base_stage = {"$geoNear": geo_near}
+    else:
+        base_stage = {"$match": filter_dict}
+    # Stages producing the page itself; everything the filter matches flows into them
+    pipeline = []
     
     # Pagination
     limit = min(max(1, limit), 1000)  # Max 1000 items per page for showing hundreds
-    skip = (page - 1) * limit
+    skip = 0
+    if cursor:
+        pipeline.append({"$match": cursor_filter(cursor, sort_field, sort_direction)})
+    else:
+        skip = (max(1, page) - 1) * limit
     
-    # Optimized query with projection to return only needed fields
+    # Optimized query with projection to return only needed fields.
+    # Inline images are only shipped on request; cards get a count computed
+    # by the database and a thumbnail URL instead.
     projection = {
         "_id": 0,
         "id": 1,
         "user_id": 1,
+        "user_name": 1,
         "title": 1,
         "description": 1,
         "category": 1,
+        "subcategory": 1,
         "budget_min": 1,
         "budget_max": 1,
         "deadline": 1,
@@ -615,99 +841,203 @@ async def get_service_requests(
         "status": 1,
         "show_best_bids": 1,
         "created_at": 1,
-        "images": 1
+        "bid_count": 1,
+        "bid_price_sum": 1,
+        "min_bid_price": 1,
+        "max_bid_price": 1,
+        "urgency_level": urgency_level_expression(now),
+        **IMAGE_SUMMARY_FIELDS
     }
-    
-    requests = await db.service_requests.find(
-        filter_dict, 
-        projection
-    ).sort(sort_field, sort_direction).skip(skip).limit(limit).to_list(limit)
-    
-    # Batch process user info and bid counts for better performance
-    user_ids = [req["user_id"] for req in requests]
-    request_ids = [req["id"] for req in requests]
-    
-    # Get user info in batch
-    users = await db.users.find(
-        {"id": {"$in": user_ids}}, 
-        {"_id": 0, "id": 1, "first_name": 1, "last_name": 1}
-    ).to_list(len(user_ids))
-    user_map = {user["id"]: f"{user['first_name']} {user['last_name']}" for user in users}
-    
-    # Get bid counts in batch
-    bid_pipeline = [
-        {"$match": {"service_request_id": {"$in": request_ids}}},
-        {"$group": {
-            "_id": "$service_request_id",
-            "count": {"$sum": 1},
-            "avg_price": {"$avg": "$price"},
-            "min_price": {"$min": "$price"},
-            "max_price": {"$max": "$price"}
-        }}
+    if include_images:
+        projection["images"] = 1
+    if near_point:
+        projection["distance_km"] = {"$round": [{"$divide": ["$distance", 1000]}, 2]}
+    if cursor_only_field:
+        projection[sort_field] = 1
+    
+    pipeline.append({"$sort": {sort_field: sort_direction, "id": sort_direction}})
+    if skip:
+        pipeline.append({"$skip": skip})
+    pipeline += [
+        {"$limit": limit},
+        {"$project": projection}
     ]
-    bid_stats = await db.bids.aggregate(bid_pipeline).to_list(len(request_ids))
-    bid_map = {stat["_id"]: stat for stat in bid_stats}
     
-    # Process results efficiently
-    for request in requests:
-        # Add user info
-        request["user_name"] = user_map.get(request["user_id"], "Unknown User")
-        
-        # Add bid info
-        bid_info = bid_map.get(request["id"], {})
-        request["bid_count"] = bid_info.get("count", 0)
-        if bid_info.get("avg_price"):
-            request["avg_bid_price"] = round(bid_info["avg_price"], 2)
-            request["min_bid_price"] = bid_info["min_price"]
-            request["max_bid_price"] = bid_info["max_price"]
-        
-        # Calculate urgency level efficiently
-        if request.get("deadline"):
-            days_until_deadline = (request["deadline"] - datetime.utcnow()).days
-            if days_until_deadline <= 3:
-                request["urgency_level"] = "urgent"
-            elif days_until_deadline <= 14:
-                request["urgency_level"] = "moderate"
-            else:
-                request["urgency_level"] = "flexible"
+    filter_params = {
+        "category": category, "subcategory": subcategory, "status": status, "location": location,
+        "budget_min": first_given(budget_min, min_budget), "budget_max": first_given(budget_max, max_budget),
+        "deadline_before": deadline_before, "deadline_after": deadline_after, "search": search,
+        "urgency": urgency, "has_images": has_images, "show_best_bids_only": show_best_bids_only,
+        "latitude": latitude, "longitude": longitude, "distance_km": distance_km
+    }
+    cache_key = await response_cache.key("service-requests", LISTING_CACHE_DEPENDS_ON, {
+        **filter_params,
+        "sort": [sort_field, sort_direction],
+        "limit": limit,
+        "page": None if cursor else max(1, page),
+        "cursor": cursor,
+        "include_images": bool(include_images),
+        "envelope": bool(envelope)
+    })
+    cached = await response_cache.get(cache_key)
+    if cached:
+        body, headers = cached
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    async def load_counts(facet_key):
+        """Total and facet counts of everything the filter matches, cached per filter set"""
+        # Grouping only; the page itself never runs inside $facet, which cannot use indexes
+        unfiltered = not filter_dict and not near_point
+        facets = {
+            "category": [{"$group": {"_id": "$category", "count": {"$sum": 1}}}],
+            "status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+            "urgency": [{"$group": {"_id": urgency_level_expression(now), "count": {"$sum": 1}}}]
+        }
+        if not unfiltered:
+            facets["total"] = [{"$count": "count"}]
+        result = await db.service_requests.aggregate([base_stage, {"$facet": facets}]).to_list(1)
+        result = result[0]
+        counts = {
+            "total": result["total"][0]["count"] if result.get("total") else 0,
+            "total_is_estimate": unfiltered,
+            "facets": {
+                name: {group["_id"]: group["count"] for group in result[name] if group["_id"] is not None}
+                for name in ("category", "status", "urgency")
+            }
+        }
+        if unfiltered:
+            # Collection metadata instead of counting every document
+            counts["total"] = await db.service_requests.estimated_document_count()
+        listing_facet_cache.set(facet_key, counts)
+        return counts
+    
+    async def load_page():
+        """Run the page (and facet) queries; shared by identical concurrent requests"""
+        page_query = db.service_requests.aggregate([base_stage] + pipeline).to_list(limit)
+        counts = None
+        if envelope:
+            facet_key = tuple(filter_params.items())
+            counts = listing_facet_cache.get(facet_key)
+        if envelope and counts is None:
+            # Every page of a filter set shares its counts, so misses are coalesced on the filter alone
+            requests, counts = await asyncio.gather(
+                page_query, listing_facets_flight.do(facet_key, lambda: load_counts(facet_key))
+            )
         else:
-            request["urgency_level"] = "flexible"
+            requests = await page_query
         
-        # Add image count
-        request["image_count"] = len(request.get("images", []))
-    
-    return serialize_mongo_doc(requests)
+        next_cursor = None
+        if len(requests) == limit:
+            next_cursor = encode_cursor(sort_field, sort_direction, requests[-1])
+        
+        # Process results efficiently
+        for request in requests:
+            # Owner name is denormalized onto the request
+            request["user_name"] = request.get("user_name") or "Unknown User"
+            
+            # Add bid info from the denormalized statistics
+            request.update(bid_stats_summary(request))
+            
+            if cursor_only_field:
+                request.pop(sort_field, None)
+            
+            if request["image_count"] and not request.get("thumbnail_url"):
+                # Inline image not yet moved to the image store
+                request["thumbnail_url"] = f"/api/service-requests/{request['id']}/images/0"
+        
+        body = dumps({"items": requests, **counts, "next_cursor": next_cursor} if envelope else requests)
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+        await response_cache.set(cache_key, body, headers)
+        return body, headers
     
-    return serialize_mongo_doc(requests)
+    body, headers = await listing_flight.do(cache_key, load_page)
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @api_router.get("/service-requests/{request_id}")
-async def get_service_request(request_id: str):
-    request = await db.service_requests.find_one({"id": request_id})
+async def get_service_request(request_id: str, loaders: Loaders = Depends(get_loaders)):
+    request = await loaders.service_requests.load(request_id)
     if not request:
         raise HTTPException(status_code=404, detail="Service request not found")
     
-    # Add user info
-    user = await db.users.find_one({"id": request["user_id"]})
-    if user:
-        request["user_name"] = f"{user['first_name']} {user['last_name']}"
+    # Owner name is denormalized; look it up only for requests stored before that
+    if not request.get("user_name"):
+        request["user_name"] = display_name(await loaders.users.load(request["user_id"]))
     
     return serialize_mongo_doc(request)
 
+@api_router.get("/service-requests/{request_id}/images/{index}")
+async def get_service_request_image(request_id: str, index: int):
+    """Serve one image of a service request so listings can reference it by URL"""
+    if index < 0:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    request = await db.service_requests.find_one(
+        {"id": request_id},
+        {"_id": 0, "id": 1, "images": {"$slice": [index, 1]}}
+    )
+    if not request or not request.get("images"):
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    image = request["images"][0]
+    if image.startswith(IMAGE_URL_PREFIX):
+        return Response(status_code=307, headers={"Location": image})
+    if not is_data_url(image):
+        # Never redirect to arbitrary owner-supplied URLs
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    try:
+        media_type, content = parse_data_url(image)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Image not found")
+    headers = {"Cache-Control": "public, max-age=300", **content_safety_headers(media_type)}
+    return Response(content=content, media_type=media_type, headers=headers)
+
 @api_router.get("/my-requests")
-async def get_my_requests(current_user: dict = Depends(get_current_user)):
-    requests = await db.service_requests.find({"user_id": current_user["id"]}).sort("created_at", -1).to_list(100)
+async def get_my_requests(
+    status: Optional[str] = None,
+    limit: Optional[int] = 100,
+    cursor: Optional[str] = None,
+    include_images: Optional[bool] = False,  # Ship full inline images (edit views)
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the current user's service requests, newest first
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page.
+    """
+    limit = min(max(1, limit), 1000)
+    match = {"user_id": current_user["id"]}
+    if status:
+        match["status"] = status
+    if cursor:
+        match = {"$and": [match, cursor_filter(cursor, "created_at", -1)]}
+    
+    requests = await db.service_requests.aggregate([
+        {"$match": match},
+        {"$sort": {"created_at": -1, "id": -1}},
+        {"$limit": limit},
+        {"$set": IMAGE_SUMMARY_FIELDS},
+        {"$unset": ["_id"] if include_images else ["_id", "images"]}
+    ]).to_list(limit)
     
     for request in requests:
-        bid_count = await db.bids.count_documents({"service_request_id": request["id"]})
-        request["bid_count"] = bid_count
+        # Bid counts come from the statistics maintained on each request
+        request.update(bid_stats_summary(request))
+        if request["image_count"] and not request.get("thumbnail_url"):
+            # Inline image not yet moved to the image store
+            request["thumbnail_url"] = f"/api/service-requests/{request['id']}/images/0"
     
-    return serialize_mongo_doc(requests)
+    headers = {}
+    if len(requests) == limit:
+        headers["X-Next-Cursor"] = encode_cursor("created_at", -1, requests[-1])
+    return MongoJSONResponse(requests, headers=headers)
 
 # Delete service request endpoint
 @api_router.delete("/service-requests/{request_id}")
 async def delete_service_request(
     request_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """Delete a service request - only by the owner"""
     # Check if request exists and belongs to user
@@ -715,21 +1045,25 @@ async def delete_service_request(
     if not existing_request:
         raise HTTPException(status_code=404, detail="Service request not found")
     
-    if existing_request["user_id"] != current_user.id:
+    if existing_request["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Can only delete your own requests")
     
     # Service requesters can now delete any of their requests, including in-progress ones
     # This gives them full control over their posts
     
-    # Delete all associated bids first
-    await db.bids.delete_many({"service_request_id": request_id})
+    accepted_bid_value = await marketplace_stats.accepted_bid_value(request_id)
     
-    # Delete the service request
+    # Delete the service request first so its bid statistics disappear with it
     result = await db.service_requests.delete_one({"id": request_id})
     
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Service request not found")
     
+    # Delete all associated bids
+    await db.bids.delete_many({"service_request_id": request_id})
+    await marketplace_stats.record_request_deleted(existing_request, accepted_bid_value)
+    await invalidate_listing_cache()
+    
     return {"message": "Service request deleted successfully"}
 
 # Update service request status endpoint
@@ -737,7 +1071,7 @@ async def delete_service_request(
 async def update_service_request_status(
     request_id: str,
     status_data: dict,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """Update service request status - only by the owner"""
     # Check if request exists and belongs to user
@@ -745,7 +1079,7 @@ async def update_service_request_status(
     if not existing_request:
         raise HTTPException(status_code=404, detail="Service request not found")
     
-    if existing_request["user_id"] != current_user.id:
+    if existing_request["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Can only update your own requests")
     
     new_status = status_data.get("status")
@@ -763,6 +1097,13 @@ async def update_service_request_status(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Service request not found")
     
+    await marketplace_stats.record_request_moved(
+        request_key(existing_request["status"], existing_request["category"]),
+        request_key(new_status, existing_request["category"]),
+        await marketplace_stats.accepted_bid_value(request_id)
+    )
+    await invalidate_listing_cache()
+    
     return {"message": f"Service request status updated to {new_status}"}
 
 # Update service request endpoint
@@ -770,7 +1111,7 @@ async def update_service_request_status(
 async def update_service_request(
     request_id: str,
     updates: dict,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """Update a service request - only by the owner"""
     # Check if request exists and belongs to user
@@ -778,7 +1119,7 @@ async def update_service_request(
     if not existing_request:
         raise HTTPException(status_code=404, detail="Service request not found")
     
-    if existing_request["user_id"] != current_user.id:
+    if existing_request["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Can only update your own requests")
     
     # Prevent updating completed/cancelled requests
@@ -786,14 +1127,32 @@ async def update_service_request(
         raise HTTPException(status_code=400, detail="Cannot update completed or cancelled requests")
     
     # Validate and prepare updates
-    allowed_fields = ["title", "description", "category", "budget_min", "budget_max", "deadline", "location", "images", "show_best_bids"]
+    allowed_fields = ["title", "description", "category", "subcategory", "budget_min", "budget_max", "deadline", "location", "images", "show_best_bids"]
     filtered_updates = {k: v for k, v in updates.items() if k in allowed_fields}
     
+    if "category" in filtered_updates or "subcategory" in filtered_updates:
+        merged = {**existing_request, **filtered_updates}
+        # A category change without a new subcategory drops the stale one
+        if "subcategory" not in filtered_updates:
+            merged["subcategory"] = None
+        filtered_updates["subcategory"] = resolve_subcategory(
+            merged["category"], merged.get("subcategory"), merged["title"], merged["description"]
+        )
+    
     if "deadline" in filtered_updates and filtered_updates["deadline"]:
         try:
             filtered_updates["deadline"] = datetime.fromisoformat(filtered_updates["deadline"].replace('Z', '+00:00'))
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid deadline format")
+    if "deadline" in filtered_updates:
+        filtered_updates["urgency_deadline"] = filtered_updates["deadline"] or FAR_FUTURE
+    
+    if "images" in filtered_updates:
+        filtered_updates["images"] = await store_request_images(filtered_updates["images"])
+    
+    if "location" in filtered_updates:
+        filtered_updates["geo"] = geocode(filtered_updates["location"])
+        filtered_updates.update(normalize_location(filtered_updates["location"]))
     
     filtered_updates["updated_at"] = datetime.utcnow()
     
@@ -806,6 +1165,14 @@ async def update_service_request(
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Service request not found")
     
+    if filtered_updates.get("category", existing_request["category"]) != existing_request["category"]:
+        await marketplace_stats.record_request_moved(
+            request_key(existing_request["status"], existing_request["category"]),
+            request_key(existing_request["status"], filtered_updates["category"]),
+            await marketplace_stats.accepted_bid_value(request_id)
+        )
+    await invalidate_listing_cache()
+    
     # Return updated request
     updated_request = await db.service_requests.find_one({"id": request_id})
     return serialize_mongo_doc(updated_request)
@@ -815,42 +1182,18 @@ async def update_service_request(
 async def accept_bid(
     request_id: str,
     bid_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """Accept a bid for a service request"""
-    # Check if request exists and belongs to user
-    request_obj = await db.service_requests.find_one({"id": request_id})
-    if not request_obj:
-        raise HTTPException(status_code=404, detail="Service request not found")
-    
-    if request_obj["user_id"] != current_user.id:
-        raise HTTPException(status_code=403, detail="Can only accept bids on your own requests")
-    
-    if request_obj["status"] != "open":
-        raise HTTPException(status_code=400, detail="Can only accept bids on open requests")
-    
-    # Check if bid exists
-    bid = await db.bids.find_one({"id": bid_id, "service_request_id": request_id})
-    if not bid:
-        raise HTTPException(status_code=404, detail="Bid not found")
-    
-    # Update bid status to accepted
-    await db.bids.update_one(
-        {"id": bid_id},
-        {"$set": {"status": "accepted", "updated_at": datetime.utcnow()}}
-    )
-    
-    # Update request status to in_progress
-    await db.service_requests.update_one(
-        {"id": request_id},
-        {"$set": {"status": "in_progress", "accepted_bid_id": bid_id, "updated_at": datetime.utcnow()}}
-    )
+    # Claims the request with a compare-and-set on status "open", so only one
+    # concurrent accept succeeds, then accepts/rejects the bids in one bulk write
+    try:
+        request_obj, bid = await perform_bid_acceptance(db, request_id, bid_id, current_user["id"])
+    except BidAcceptanceError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail)
     
-    # Reject all other bids for this request
-    await db.bids.update_many(
-        {"service_request_id": request_id, "id": {"$ne": bid_id}},
-        {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}}
-    )
+    await marketplace_stats.record_bid_accepted(request_obj, "in_progress", bid["price"])
+    await invalidate_listing_cache()
     
     return {"message": "Bid accepted successfully"}
 
@@ -859,7 +1202,7 @@ async def accept_bid(
 async def decline_bid(
     request_id: str,
     bid_id: str,
-    current_user: User = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user)
 ):
     """Decline a bid for a service request"""
     # Check if request exists and belongs to user
@@ -867,7 +1210,7 @@ async def decline_bid(
     if not request_obj:
         raise HTTPException(status_code=404, detail="Service request not found")
     
-    if request_obj["user_id"] != current_user.id:
+    if request_obj["user_id"] != current_user["id"]:
         raise HTTPException(status_code=403, detail="Can only decline bids on your own requests")
     
     # Check if bid exists
@@ -884,6 +1227,8 @@ async def decline_bid(
         {"$set": {"status": "declined", "updated_at": datetime.utcnow()}}
     )
     
+    await invalidate_listing_cache()
+    
     return {"message": "Bid declined successfully"}
 
 # Contact bidder endpoint
@@ -921,26 +1266,10 @@ async def contact_bidder(
 # Bid Routes
 @api_router.post("/bids", response_model=Bid)
 async def create_bid(bid_data: BidCreate, current_user: dict = Depends(get_current_user)):
-    # Check if service request exists
-    request = await db.service_requests.find_one({"id": bid_data.service_request_id})
-    if not request:
-        raise HTTPException(status_code=404, detail="Service request not found")
-    
-    if request["status"] != "open":
-        raise HTTPException(status_code=400, detail="Cannot bid on closed requests")
-    
     # Check if user is a provider
     if "provider" not in current_user.get("roles", []):
         raise HTTPException(status_code=403, detail="Only providers can submit bids")
     
-    # Check if provider already bid on this request
-    existing_bid = await db.bids.find_one({
-        "service_request_id": bid_data.service_request_id,
-        "provider_id": current_user["id"]
-    })
-    if existing_bid:
-        raise HTTPException(status_code=400, detail="You have already bid on this request")
-    
     # Handle start_date conversion from string to datetime if provided
     bid_dict = bid_data.dict()
     if bid_dict.get("start_date"):
@@ -949,6 +1278,13 @@ async def create_bid(bid_data: BidCreate, current_user: dict = Depends(get_curre
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid start_date format. Use ISO format (YYYY-MM-DD)")
     
+    if BID_UNIQUE_INDEX not in ensured_indexes:
+        # Without the unique index (legacy duplicates blocked it) check by hand; racy, but not unguarded
+        if await db.bids.find_one(
+            {"service_request_id": bid_data.service_request_id, "provider_id": current_user["id"]}, {"_id": 1}
+        ):
+            raise HTTPException(status_code=400, detail="You have already bid on this request")
+    
     provider_name = f"{current_user['first_name']} {current_user['last_name']}"
     
     bid = {
@@ -966,45 +1302,137 @@ async def create_bid(bid_data: BidCreate, current_user: dict = Depends(get_curre
         "updated_at": datetime.utcnow()
     }
     
-    await db.bids.insert_one(bid)
+    # The unique (service_request_id, provider_id) index rejects a second bid
+    # from the same provider, even when two submissions race each other
+    try:
+        await db.bids.insert_one(bid)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="You have already bid on this request")
+    
+    # The status check rides on the counter update: count the bid only while
+    # the request is still open, otherwise withdraw it and find out why
+    result = await db.service_requests.update_one(
+        {"id": bid_data.service_request_id, "status": "open"},
+        bid_stats_increment(bid_data.price)
+    )
+    if result.matched_count == 0:
+        await db.bids.delete_one({"id": bid["id"]})
+        if not await db.service_requests.find_one({"id": bid_data.service_request_id}, {"_id": 1}):
+            raise HTTPException(status_code=404, detail="Service request not found")
+        raise HTTPException(status_code=400, detail="Cannot bid on closed requests")
+    
+    await marketplace_stats.record_bid_created(bid_data.price)
+    await invalidate_listing_cache()
     return serialize_mongo_doc(bid)
 
+BID_SORT_FIELDS = ["created_at", "price"]
+
 @api_router.get("/service-requests/{request_id}/bids")
-async def get_bids_for_request(request_id: str, current_user: dict = Depends(get_current_user)):
-    request = await db.service_requests.find_one({"id": request_id})
+async def get_bids_for_request(
+    request_id: str,
+    sort_by: Optional[str] = "created_at",
+    sort_order: Optional[str] = "desc",
+    limit: Optional[int] = 100,
+    cursor: Optional[str] = None,
+    summary: Optional[bool] = False,  # Leave out the proposal text
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the bids on a service request
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page.
+    """
+    if sort_by not in BID_SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"sort_by must be one of: {', '.join(BID_SORT_FIELDS)}")
+    sort_direction = 1 if sort_order == "asc" else -1
+    limit = min(max(1, limit), 1000)
+    projection = {"_id": 0, "proposal": 0} if summary else {"_id": 0}
+    
+    page_filter = {"service_request_id": request_id}
+    if cursor:
+        page_filter = {"$and": [page_filter, cursor_filter(cursor, sort_by, sort_direction)]}
+    
+    # The access check does not depend on the page, so read both at once
+    request, user_bid, bids = await asyncio.gather(
+        db.service_requests.find_one({"id": request_id}, {"_id": 0, "user_id": 1, "show_best_bids": 1}),
+        db.bids.find_one({"service_request_id": request_id, "provider_id": current_user["id"]}, {"_id": 1}),
+        db.bids.find(page_filter, projection)
+            .sort([(sort_by, sort_direction), ("id", sort_direction)])
+            .limit(limit)
+            .to_list(limit)
+    )
     if not request:
         raise HTTPException(status_code=404, detail="Service request not found")
     
     # Only request owner or providers who bid can see bids
     user_is_owner = current_user["id"] == request["user_id"]
-    user_bid = await db.bids.find_one({"service_request_id": request_id, "provider_id": current_user["id"]})
     
     if not user_is_owner and not user_bid:
         # If show_best_bids is enabled, show top 3 bids
         if request.get("show_best_bids", False):
-            bids = await db.bids.find({"service_request_id": request_id}).sort("price", 1).limit(3).to_list(3)
-        else:
-            raise HTTPException(status_code=403, detail="Access denied")
-    else:
-        bids = await db.bids.find({"service_request_id": request_id}).sort("created_at", -1).to_list(100)
+            bids = await db.bids.find({"service_request_id": request_id}, projection).sort("price", 1).limit(3).to_list(3)
+            return MongoJSONResponse(bids)
+        raise HTTPException(status_code=403, detail="Access denied")
     
-    return serialize_mongo_doc(bids)
+    headers = {}
+    if len(bids) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(sort_by, sort_direction, bids[-1])
+    return MongoJSONResponse(bids, headers=headers)
 
 @api_router.get("/my-bids")
-async def get_my_bids(current_user: dict = Depends(get_current_user)):
+async def get_my_bids(
+    status: Optional[str] = None,
+    category: Optional[str] = None,  # Category of the service request bid on
+    limit: Optional[int] = 100,
+    cursor: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Get the current provider's bids, newest first
+
+    Pass the `X-Next-Cursor` response header back as `cursor` to fetch the
+    next page.
+    """
     if "provider" not in current_user.get("roles", []):
         raise HTTPException(status_code=403, detail="Only providers can view bids")
     
-    bids = await db.bids.find({"provider_id": current_user["id"]}).sort("created_at", -1).to_list(100)
-    
-    # Add service request info
-    for bid in bids:
-        request = await db.service_requests.find_one({"id": bid["service_request_id"]})
-        if request:
-            bid["service_title"] = request["title"]
-            bid["service_category"] = request["category"]
+    limit = min(max(1, limit), 1000)
+    match = {"provider_id": current_user["id"]}
+    if status:
+        match["status"] = status
+    if cursor:
+        match = {"$and": [match, cursor_filter(cursor, "created_at", -1)]}
+    
+    # Attach the title and category of each bid's service request
+    lookup = [
+        {"$lookup": {
+            "from": "service_requests",
+            "let": {"request_id": "$service_request_id"},
+            "pipeline": [
+                {"$match": {"$expr": {"$eq": ["$id", "$$request_id"]}}},
+                {"$project": {"_id": 0, "title": 1, "category": 1}}
+            ],
+            "as": "service_request"
+        }},
+        {"$set": {
+            "service_title": {"$arrayElemAt": ["$service_request.title", 0]},
+            "service_category": {"$arrayElemAt": ["$service_request.category", 0]}
+        }},
+        {"$unset": ["_id", "service_request"]}
+    ]
+    pipeline = [{"$match": match}, {"$sort": {"created_at": -1, "id": -1}}]
+    if category:
+        # The category lives on the request, so join before cutting the page
+        pipeline += lookup + [{"$match": {"service_category": category}}, {"$limit": limit}]
+    else:
+        pipeline += [{"$limit": limit}] + lookup
+    bids = await db.bids.aggregate(pipeline).to_list(limit)
     
-    return serialize_mongo_doc(bids)
+    headers = {}
+    if len(bids) == limit:
+        headers["X-Next-Cursor"] = encode_cursor("created_at", -1, bids[-1])
+    return MongoJSONResponse(bids, headers=headers)
 
 # Provider Profile Routes
 @api_router.post("/provider-profile")
@@ -1057,7 +1485,7 @@ async def update_provider_profile(profile_data: ProviderProfileCreate, current_u
 async def add_user_role(role_data: dict, current_user: dict = Depends(get_current_user)):
     """Add a new role to user (customer can become provider and vice versa)"""
     new_role = role_data.get("role")
-    if new_role not in ["customer", "provider"]:
+    if new_role not in SELF_ASSIGNABLE_ROLES:
         raise HTTPException(status_code=400, detail="Invalid role")
     
     current_roles = current_user.get("roles", [])
@@ -1068,8 +1496,30 @@ async def add_user_role(role_data: dict, current_user: dict = Depends(get_curren
             {"id": current_user["id"]},
             {"$set": {"roles": current_roles, "updated_at": datetime.utcnow()}}
         )
+        invalidate_current_user(current_user["id"])
+    
+    updated_user = await db.users.find_one({"id": current_user["id"]})
+    return serialize_mongo_doc(updated_user)
+
+@api_router.put("/user/profile")
+async def update_user_profile(
+    profile_data: UserProfileUpdate,
+    background_tasks: BackgroundTasks,
+    current_user: dict = Depends(get_current_user)
+):
+    """Update the current user's name/phone; name changes propagate in the background"""
+    updates = {k: v for k, v in profile_data.dict().items() if v is not None}
+    if not updates:
+        raise HTTPException(status_code=400, detail="No fields to update")
+    updates["updated_at"] = datetime.utcnow()
+    await db.users.update_one({"id": current_user["id"]}, {"$set": updates})
+    invalidate_current_user(current_user["id"])
+    
+    if "first_name" in updates or "last_name" in updates:
+        background_tasks.add_task(propagate_display_name, current_user["id"])
     
     updated_user = await db.users.find_one({"id": current_user["id"]})
+    updated_user.pop("password_hash", None)
     return serialize_mongo_doc(updated_user)
 
 @api_router.get("/user/roles")
@@ -1078,25 +1528,113 @@ async def get_user_roles(current_user: dict = Depends(get_current_user)):
     return {"roles": current_user.get("roles", [])}
 
 # Image upload endpoint
+async def store_request_images(images: List[str]) -> List[str]:
+    """Move inline data URLs into the image store before they reach a document"""
+    try:
+        return await image_store.externalize(images)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImageType as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid image data")
+
 @api_router.post("/upload-image")
 async def upload_image(file: UploadFile = File(...)):
-    """Upload image and return base64 encoded string"""
-    try:
-        # Read file content
-        contents = await file.read()
-        
-        # Convert to base64
-        import base64
-        encoded_string = base64.b64encode(contents).decode('utf-8')
-        
-        # Return with proper data URL format
-        file_type = file.content_type or 'image/jpeg'
-        data_url = f"data:{file_type};base64,{encoded_string}"
-        
-        return {"image": data_url, "filename": file.filename}
+    """Upload an image into the content-addressed store and return its URL"""
+    async def chunks():
+        while True:
+            chunk = await file.read(IMAGE_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
     
+    try:
+        # The declared content type is ignored; only verified raster images are stored
+        content_type = detect_content_type(file.file)
+        stored = await image_store.save_stream(chunks(), content_type)
+        if stored["created"]:
+            # The upload is spooled to a temp file, so the workers re-read it from there
+            await image_store.create_variants(stored["hash"], file.file)
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedImageType as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Image upload failed: {str(e)}")
+    
+    return {
+        "image": image_url(stored["hash"]),
+        "thumbnail": f"{image_url(stored['hash'])}?variant=thumb",
+        "hash": stored["hash"],
+        "filename": file.filename
+    }
+
+@api_router.get("/images/{image_hash}")
+async def get_image(
+    image_hash: str,
+    variant: Optional[str] = None,
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Stream a stored image with ETag, long-lived caching and byte ranges.
+    
+    `variant=thumb|medium` selects a resized copy; images without one fall back
+    to the original.
+    """
+    if variant is not None and variant not in IMAGE_VARIANTS:
+        raise HTTPException(status_code=400, detail=f"Invalid variant. Must be one of: {', '.join(IMAGE_VARIANTS)}")
+    
+    grid_out = await image_store.open(image_hash, variant) if variant else None
+    if grid_out is None:
+        variant = None
+        grid_out = await image_store.open(image_hash)
+    if grid_out is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    # Content-addressed, so the hash is a strong validator and never changes
+    etag = f'"{variant_name(image_hash, variant)}"' if variant else f'"{image_hash}"'
+    media_type = (grid_out.metadata or {}).get("content_type", "application/octet-stream")
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "public, max-age=31536000, immutable",
+        "Accept-Ranges": "bytes",
+        **content_safety_headers(media_type)
+    }
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    length = grid_out.length
+    start, end = 0, length - 1
+    status_code = 200
+    if range_header:
+        byte_range = parse_byte_range(range_header, length)
+        if byte_range is None:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{length}"})
+        start, end = byte_range
+        status_code = 206
+        headers["Content-Range"] = f"bytes {start}-{end}/{length}"
+    headers["Content-Length"] = str(end - start + 1)
+    
+    grid_out.seek(start)
+    
+    async def stream():
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await grid_out.read(min(IMAGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    
+    return StreamingResponse(stream(), status_code=status_code, media_type=media_type, headers=headers)
+
+@api_router.post("/admin/migrate-images")
+async def migrate_images(admin_user: dict = Depends(get_admin_user)):
+    """Move inline data URL images out of service requests into the image store"""
+    migrated = await migrate_inline_images(db.service_requests, image_store)
+    await invalidate_listing_cache()
+    return {"message": f"Migrated images for {migrated} service requests"}
 
 # Bid Messages (Negotiation)
 @api_router.post("/bid-messages")
@@ -1120,19 +1658,20 @@ async def create_bid_message(message_data: BidMessageCreate, current_user: dict
     message = BidMessage(
         **message_data.dict(),
         sender_id=current_user["id"],
+        sender_name=display_name(current_user),
         sender_role="provider" if "provider" in current_user.get("roles", []) else "customer"
     )
     await db.bid_messages.insert_one(message.dict())
     return message
 
 @api_router.get("/bid-messages/{bid_id}")
-async def get_bid_messages(bid_id: str, current_user: dict = Depends(get_current_user)):
+async def get_bid_messages(bid_id: str, current_user: dict = Depends(get_current_user), loaders: Loaders = Depends(get_loaders)):
     # Verify access
-    bid = await db.bids.find_one({"id": bid_id})
+    bid = await loaders.bids.load(bid_id)
     if not bid:
         raise HTTPException(status_code=404, detail="Bid not found")
     
-    request = await db.service_requests.find_one({"id": bid["service_request_id"]})
+    request = await loaders.service_requests.load(bid["service_request_id"])
     if not request:
         raise HTTPException(status_code=404, detail="Service request not found")
     
@@ -1144,13 +1683,14 @@ async def get_bid_messages(bid_id: str, current_user: dict = Depends(get_current
     
     messages = await db.bid_messages.find({"bid_id": bid_id}).sort("created_at", 1).to_list(100)
     
-    # Add sender names
-    for message in messages:
-        user = await db.users.find_one({"id": message["sender_id"]})
+    # Sender names are denormalized; batch-load any stored before that
+    unnamed = [message for message in messages if not message.get("sender_name")]
+    senders = await loaders.users.load_many(message["sender_id"] for message in unnamed)
+    for message, user in zip(unnamed, senders):
         if user:
-            message["sender_name"] = f"{user['first_name']} {user['last_name']}"
+            message["sender_name"] = display_name(user)
     
-    return serialize_mongo_doc(messages)
+    return MongoJSONResponse(messages)
 
 # AI Recommendations endpoint with caching
 @api_router.post("/ai-recommendations")
@@ -1229,33 +1769,59 @@ async def get_service_recommendations(request: LocationRecommendationRequest):
         }
 
 # Service Providers endpoints
+def service_provider_filter(
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    verified_only: bool = False,
+    min_rating: float = 0.0
+) -> dict:
+    filter_query = {}
+    
+    if category:
+        filter_query["services"] = {"$in": [category]}
+    
+    if location:
+        filter_query.update(location_filter(location) or {})
+        
+    if verified_only:
+        filter_query["verified"] = True
+        
+    if min_rating > 0:
+        filter_query["google_rating"] = {"$gte": min_rating}
+    
+    return filter_query
+
 @api_router.get("/service-providers")
 async def get_service_providers(
     category: Optional[str] = None,
     location: Optional[str] = None,
     verified_only: bool = False,
     min_rating: float = 0.0,
-    latitude: Optional[float] = None,
-    longitude: Optional[float] = None,
-    max_distance_km: float = 50.0,
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    max_distance_km: float = Query(50.0, gt=0),
     limit: int = 20
 ):
     """Get service providers with filtering options"""
+    key = (category, location, verified_only, min_rating, latitude, longitude, max_distance_km, limit)
+    body = await providers_flight.do(key, lambda: load_service_providers(
+        category, location, verified_only, min_rating, latitude, longitude, max_distance_km, limit
+    ))
+    return Response(content=body, media_type="application/json")
+
+async def load_service_providers(
+    category: Optional[str],
+    location: Optional[str],
+    verified_only: bool,
+    min_rating: float,
+    latitude: Optional[float],
+    longitude: Optional[float],
+    max_distance_km: float,
+    limit: int
+):
+    """Run the provider query; shared by identical concurrent requests"""
     try:
-        # Build filter query
-        filter_query = {}
-        
-        if category:
-            filter_query["services"] = {"$in": [category]}
-        
-        if location:
-            filter_query["location"] = {"$regex": location, "$options": "i"}
-            
-        if verified_only:
-            filter_query["verified"] = True
-            
-        if min_rating > 0:
-            filter_query["google_rating"] = {"$gte": min_rating}
+        filter_query = service_provider_filter(category, location, verified_only, min_rating)
         
         # Get providers
         providers = await db.service_providers.find(filter_query).limit(limit).to_list(limit)
@@ -1290,20 +1856,23 @@ async def get_service_providers(
             # Sort by distance
             providers = sorted(filtered_providers, key=lambda x: x["distance_km"])
         
-        return serialize_mongo_doc(providers)
+        return dumps(strip_mongo_ids(providers))
         
     except Exception as e:
         print(f"Error getting service providers: {e}")
-        return []
+        return dumps([])
 
 @api_router.get("/service-providers/{provider_id}")
 async def get_service_provider(provider_id: str):
     """Get detailed information about a specific service provider"""
-    provider = await db.service_providers.find_one({"id": provider_id})
+    async def load_provider():
+        return serialize_mongo_doc(await db.service_providers.find_one({"id": provider_id}))
+    
+    provider = await provider_flight.do(provider_id, load_provider)
     if not provider:
         raise HTTPException(status_code=404, detail="Service provider not found")
     
-    return serialize_mongo_doc(provider)
+    return provider
 
 async def get_ai_recommendations(service_category: str, description: str, location: str = None, title: str = None, budget_min: float = None, budget_max: float = None, deadline: str = None, urgency_level: str = None):
     """Get AI-powered service provider recommendations using comprehensive request details"""
@@ -1421,6 +1990,278 @@ async def get_ai_recommendations(service_category: str, description: str, locati
 # OLD INITIALIZATION FUNCTIONS REMOVED TO PREVENT CONFLICTS
 # These were replaced by initialize_comprehensive_sample_data()
 
+async def repair_bid_stats(request_ids: Optional[List[str]] = None) -> int:
+    """Recompute denormalized bid statistics from db.bids, rewriting any that drifted"""
+    bid_match = {"service_request_id": {"$in": request_ids}} if request_ids is not None else {}
+    request_match = {"id": {"$in": request_ids}} if request_ids is not None else {}
+    
+    stats = {}
+    async for stat in db.bids.aggregate([
+        {"$match": bid_match},
+        {"$group": {"_id": "$service_request_id", **BID_STATS_GROUP}}
+    ]):
+        stats[stat.pop("_id")] = stat
+    
+    projection = {"_id": 0, "id": 1, **{field: 1 for field in BID_STAT_FIELDS}}
+    updates = []
+    async for request in db.service_requests.find(request_match, projection):
+        repair = bid_stats_repair(request, stats.get(request["id"]))
+        if repair:
+            updates.append(UpdateOne(*repair))
+    
+    if updates:
+        await db.service_requests.bulk_write(updates, ordered=False)
+    return len(updates)
+
+@api_router.post("/admin/repair-bid-stats")
+async def repair_bid_stats_endpoint(admin_user: dict = Depends(get_admin_user)):
+    """Recompute bid statistics on every service request"""
+    repaired = await repair_bid_stats()
+    await invalidate_listing_cache()
+    return {"message": f"Repaired bid statistics on {repaired} service requests"}
+
+async def backfill_fields(collection, selector: dict, source_fields: List[str], compute) -> int:
+    """Set derived fields on the documents matching `selector`, i.e. still lacking them.
+
+    `compute` maps a document (id plus source_fields) to the fields to set.
+    Documents whose computed fields equal what they already hold are skipped.
+    """
+    updates = []
+    backfilled = 0
+    async for doc in collection.find(selector, {"_id": 0, "id": 1, **{name: 1 for name in source_fields}}):
+        fields = compute(doc)
+        if all(doc.get(name) == value for name, value in fields.items()):
+            continue
+        updates.append(UpdateOne({"id": doc["id"]}, {"$set": fields}))
+        if len(updates) >= 500:
+            await collection.bulk_write(updates, ordered=False)
+            backfilled += len(updates)
+            updates = []
+    if updates:
+        await collection.bulk_write(updates, ordered=False)
+        backfilled += len(updates)
+    return backfilled
+
+async def backfill_request_field(field: str, source_fields: List[str], compute, selector: dict) -> int:
+    """Set a derived field on the service requests matching `selector`"""
+    return await backfill_fields(
+        db.service_requests, selector, source_fields, lambda request: {field: compute(request)}
+    )
+
+async def backfill_subcategories() -> int:
+    """Infer subcategories for service requests that have none"""
+    return await backfill_request_field(
+        "subcategory",
+        ["category", "title", "description"],
+        lambda request: infer_subcategory(request.get("category", ""), request.get("title", ""), request.get("description", "")),
+        {"subcategory": None}
+    )
+
+async def backfill_request_geo() -> int:
+    """Geocode service requests that have a location but no point"""
+    return await backfill_request_field(
+        "geo", ["location"], lambda request: geocode(request.get("location")),
+        {"geo": None, "location": {"$nin": [None, ""]}}
+    )
+
+async def backfill_urgency_deadlines() -> int:
+    """Store the urgency sort key on requests saved before it existed"""
+    result = await db.service_requests.update_many(
+        {URGENCY_SORT_FIELD: None},
+        [{"$set": {URGENCY_SORT_FIELD: {"$ifNull": ["$deadline", FAR_FUTURE]}}}]
+    )
+    return result.modified_count
+
+async def backfill_normalized_locations() -> int:
+    """Store normalized location fields on requests and providers that have a location but no tokens"""
+    backfilled = 0
+    for collection in (db.service_requests, db.service_providers):
+        backfilled += await backfill_fields(
+            collection, {"location_tokens": {"$in": [None, []]}, "location": {"$nin": [None, ""]}}, ["location"],
+            lambda doc: normalize_location(doc.get("location"))
+        )
+    return backfilled
+
+STATS_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('STATS_RECONCILE_INTERVAL_SECONDS', '300'))
+
+async def reconcile_stats_periodically():
+    """Finish interrupted bid acceptances and correct drift in the marketplace rollups"""
+    while True:
+        await asyncio.sleep(STATS_RECONCILE_INTERVAL_SECONDS)
+        try:
+            # Acceptances whose bid updates failed would otherwise wait for a restart
+            await finish_pending_acceptances(db)
+        except Exception as e:
+            logger.warning(f"Finishing pending bid acceptances failed: {e}")
+        try:
+            await marketplace_stats.reconcile()
+        except Exception as e:
+            logger.warning(f"Marketplace stats reconciliation failed: {e}")
+
+# Data exports (streamed, constant memory)
+EARTH_RADIUS_KM = 6378.1
+
+def export_response(collection, filter_query: dict, columns: List[str], export_format: str, filename: str):
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Must be one of: {', '.join(EXPORT_FORMATS)}")
+    cursor = collection.find(filter_query, export_projection(columns)).batch_size(EXPORT_BATCH_SIZE)
+    lines = csv_lines(cursor, columns) if export_format == "csv" else ndjson_lines(cursor, dumps)
+    return StreamingResponse(
+        lines,
+        media_type=EXPORT_FORMATS[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{export_format}"'}
+    )
+
+@api_router.get("/admin/export/service-requests")
+async def export_service_requests(
+    export_format: str = Query("ndjson", alias="format"),
+    category: Optional[str] = None,
+    subcategory: Optional[str] = None,
+    status: Optional[str] = None,
+    location: Optional[str] = None,
+    budget_min: Optional[float] = None,
+    budget_max: Optional[float] = None,
+    deadline_before: Optional[str] = None,
+    deadline_after: Optional[str] = None,
+    search: Optional[str] = None,
+    urgency: Optional[str] = None,
+    has_images: Optional[bool] = None,
+    show_best_bids_only: Optional[bool] = None,
+    min_budget: Optional[float] = None,
+    max_budget: Optional[float] = None,
+    distance_km: Optional[float] = Query(None, gt=0),
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    admin_user: dict = Depends(get_admin_user)
+):
+    """Export service requests matching the listing filters as NDJSON or CSV"""
+    builder = FilterBuilder().add(service_request_filter(
+        datetime.utcnow(),
+        category=category,
+        subcategory=subcategory,
+        status=status,
+        location=location,
+        budget_min=budget_min,
+        budget_max=budget_max,
+        min_budget=min_budget,
+        max_budget=max_budget,
+        deadline_before=deadline_before,
+        deadline_after=deadline_after,
+        search=search,
+        urgency=urgency,
+        has_images=has_images,
+        show_best_bids_only=show_best_bids_only
+    ))
+    if latitude is not None and longitude is not None and distance_km is not None:
+        # Unordered radius match; unlike $geoNear it works in a plain find
+        builder.add({"geo": {"$geoWithin": {
+            "$centerSphere": [[longitude, latitude], distance_km / EARTH_RADIUS_KM]
+        }}})
+    return export_response(
+        db.service_requests, builder.build(), SERVICE_REQUEST_EXPORT_COLUMNS, export_format, "service-requests"
+    )
+
+@api_router.get("/admin/export/bids")
+async def export_bids(
+    export_format: str = Query("ndjson", alias="format"),
+    service_request_id: Optional[str] = None,
+    provider_id: Optional[str] = None,
+    status: Optional[str] = None,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """Export bids as NDJSON or CSV"""
+    filter_query = {}
+    if service_request_id:
+        filter_query["service_request_id"] = service_request_id
+    if provider_id:
+        filter_query["provider_id"] = provider_id
+    if status:
+        filter_query["status"] = status
+    return export_response(db.bids, filter_query, BID_EXPORT_COLUMNS, export_format, "bids")
+
+@api_router.get("/admin/export/service-providers")
+async def export_service_providers(
+    export_format: str = Query("ndjson", alias="format"),
+    category: Optional[str] = None,
+    location: Optional[str] = None,
+    verified_only: bool = False,
+    min_rating: float = 0.0,
+    admin_user: dict = Depends(get_admin_user)
+):
+    """Export service providers matching the directory filters as NDJSON or CSV"""
+    return export_response(
+        db.service_providers,
+        service_provider_filter(category, location, verified_only, min_rating),
+        PROVIDER_EXPORT_COLUMNS,
+        export_format,
+        "service-providers"
+    )
+
+@api_router.get("/admin/password-hash-stats")
+async def password_hash_stats(admin_user: dict = Depends(get_admin_user)):
+    """Load and latency of the password hashing pool"""
+    return password_hasher.stats()
+
+@api_router.get("/admin/cache-stats")
+async def cache_stats(admin_user: dict = Depends(get_admin_user)):
+    """Hit/miss statistics of the listing response cache"""
+    return response_cache.stats()
+
+@api_router.get("/admin/coalescing-stats")
+async def coalescing_stats(admin_user: dict = Depends(get_admin_user)):
+    """How many reads joined an identical in-flight query instead of running their own"""
+    flights = [listing_flight, listing_facets_flight, providers_flight, provider_flight]
+    return {
+        "total_coalesced": sum(flight.coalesced for flight in flights),
+        **{flight.name: flight.stats() for flight in flights}
+    }
+
+@api_router.post("/admin/reconcile-stats")
+async def reconcile_stats_endpoint(admin_user: dict = Depends(get_admin_user)):
+    """Recompute the marketplace rollups from the source collections"""
+    counters = await marketplace_stats.reconcile()
+    return {"message": f"Reconciled {counters} marketplace counters"}
+
+# Where each user's display name is copied: (collection, user id field, name field)
+DENORMALIZED_NAMES = [
+    ("service_requests", "user_id", "user_name"),
+    ("bids", "provider_id", "provider_name"),
+    ("bid_messages", "sender_id", "sender_name")
+]
+
+async def propagate_display_name(user_id: str):
+    """Rewrite a user's denormalized name everywhere it was copied"""
+    # Read the name now rather than when scheduled, so racing renames settle on the latest
+    name = display_name(await db.users.find_one({"id": user_id}, {"_id": 0, "first_name": 1, "last_name": 1}))
+    if not name:
+        return
+    for collection, id_field, name_field in DENORMALIZED_NAMES:
+        await db[collection].update_many(
+            {id_field: user_id, name_field: {"$ne": name}},
+            {"$set": {name_field: name}}
+        )
+    await invalidate_listing_cache()
+
+async def backfill_display_names() -> int:
+    """Copy owner/sender names onto documents stored before they were denormalized"""
+    backfilled = 0
+    for collection, id_field, name_field in DENORMALIZED_NAMES:
+        # None as a query value also matches documents without the field
+        missing = {name_field: None}
+        user_ids = await db[collection].distinct(id_field, missing)
+        for start in range(0, len(user_ids), 500):
+            users = await db.users.find(
+                {"id": {"$in": user_ids[start:start + 500]}},
+                {"_id": 0, "id": 1, "first_name": 1, "last_name": 1}
+            ).to_list(None)
+            if users:
+                result = await db[collection].bulk_write([
+                    UpdateMany({id_field: user["id"], **missing}, {"$set": {name_field: display_name(user)}})
+                    for user in users
+                ], ordered=False)
+                backfilled += result.modified_count
+    return backfilled
+
 # Clear test data endpoint (for development)
 @api_router.post("/admin/clear-test-data")
 async def clear_test_data():
@@ -1431,7 +2272,10 @@ async def clear_test_data():
         await db.bids.delete_many({})
         await db.bid_messages.delete_many({})
         await db.users.delete_many({})
+        invalidate_current_user()
         await db.provider_profiles.delete_many({})
+        await marketplace_stats.reconcile()
+        await invalidate_listing_cache()
         
         return {"message": "Test data cleared successfully"}
     except Exception as e:
@@ -1442,6 +2286,25 @@ async def clear_test_data():
 async def startup_event():
     await initialize_comprehensive_sample_data()
     await create_database_indexes()
+    migrated = await migrate_inline_images(db.service_requests, image_store)
+    print(f"✅ Moved inline images of {migrated} service requests into the image store")
+    finished = await finish_pending_acceptances(db)
+    print(f"✅ Finished {finished} interrupted bid acceptances")
+    repaired = await repair_bid_stats()
+    print(f"✅ Repaired bid statistics on {repaired} service requests")
+    categorized = await backfill_subcategories()
+    print(f"✅ Backfilled subcategories on {categorized} service requests")
+    geocoded = await backfill_request_geo()
+    print(f"✅ Backfilled locations on {geocoded} service requests")
+    dated = await backfill_urgency_deadlines()
+    print(f"✅ Backfilled urgency sort keys on {dated} service requests")
+    normalized = await backfill_normalized_locations()
+    print(f"✅ Normalized locations on {normalized} requests and providers")
+    named = await backfill_display_names()
+    print(f"✅ Backfilled display names on {named} requests, bids and messages")
+    counters = await marketplace_stats.reconcile()
+    print(f"✅ Reconciled {counters} marketplace stats counters")
+    app.state.stats_reconciler = asyncio.create_task(reconcile_stats_periodically())
 
 async def initialize_comprehensive_sample_data():
     """Initialize the database with HUNDREDS of comprehensive sample data"""
@@ -1457,14 +2320,15 @@ async def initialize_comprehensive_sample_data():
     await db.service_requests.delete_many({})
     await db.bids.delete_many({})
     await db.users.delete_many({"email": {"$regex": "@bidme.com|@provider|@demo"}})
+    invalidate_current_user()
     print("✅ Cleared all existing marketplace data")
     
-    # Sample images (using placeholder image service)
+    # Sample images, rendered as PNG placeholders
     sample_images = [
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNmMGY0ZjgiLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+S2l0Y2hlbiBSZW5vdmF0aW9uPC90ZXh0Pgo8L3N2Zz4K",
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNlZGY0ZmYiLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+UGx1bWJpbmcgV29yazwvdGV4dD4KPC9zdmc+",
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNmZWY5ZTciLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+V2ViIERldmVsb3BtZW50PC90ZXh0Pgo8L3N2Zz4K",
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNlZGY0ZmYiLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+Q29uc3RydWN0aW9uPC90ZXh0Pgo8L3N2Zz4K"
+        placeholder_data_url("Kitchen Renovation", "#f0f4f8"),
+        placeholder_data_url("Plumbing Work", "#edf4ff"),
+        placeholder_data_url("Web Development", "#fef9e7"),
+        placeholder_data_url("Construction", "#edf4ff")
     ]
     
     # Create comprehensive demo users
@@ -1474,7 +2338,7 @@ async def initialize_comprehensive_sample_data():
             "id": str(uuid.uuid4()),
             "email": f"customer{i+1}@bidme.com",
             "phone": f"(555) {100 + i:03d}-{1000 + i:04d}",
-            "password_hash": get_password_hash("password123"),
+            "password_hash": await get_password_hash("password123"),
             "roles": ["customer"],
             "first_name": f"Customer{i+1}",
             "last_name": "User",
@@ -1659,7 +2523,7 @@ async def initialize_comprehensive_sample_data():
             "id": str(uuid.uuid4()),
             "email": f"provider{i+1}@bidme.com",
             "phone": sample_providers[i]["phone"],
-            "password_hash": get_password_hash("provider123"),
+            "password_hash": await get_password_hash("provider123"),
             "roles": ["customer", "provider"],
             "first_name": sample_providers[i]["business_name"].split()[0],
             "last_name": "Provider",
@@ -1672,7 +2536,7 @@ async def initialize_comprehensive_sample_data():
     
     # Insert all providers
     for provider_data in sample_providers:
-        provider = ServiceProvider(**provider_data)
+        provider = ServiceProvider(**provider_data, **normalize_location(provider_data["location"]))
         await db.service_providers.insert_one(provider.dict())
     
     print(f"✅ Created {len(sample_providers)} comprehensive service providers")
@@ -1790,6 +2654,7 @@ async def initialize_comprehensive_sample_data():
         request_data = {
             "id": str(uuid.uuid4()),
             "user_id": demo_users[i % len(demo_users)]["id"],
+            "user_name": display_name(demo_users[i % len(demo_users)]),
             "title": title,
             "description": description,
             "category": category,
@@ -1808,6 +2673,7 @@ async def initialize_comprehensive_sample_data():
     # Insert all requests
     for request_data in sample_requests:
         request = ServiceRequest(**request_data)
+        derive_request_fields(request)
         await db.service_requests.insert_one(request.dict())
     
     print(f"✅ Created {len(sample_requests)} comprehensive service requests")
@@ -1857,11 +2723,11 @@ async def initialize_comprehensive_sample_data():
     🏢 Provider access: provider1-50@bidme.com / provider123
     """)
     
-    # Sample images (using placeholder image service)
+    # Sample images, rendered as PNG placeholders
     sample_images = [
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNmMGY0ZjgiLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+S2l0Y2hlbiBSZW5vdmF0aW9uPC90ZXh0Pgo8L3N2Zz4K",
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNlZGY0ZmYiLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+UGx1bWJpbmcgV29yazwvdGV4dD4KPC9zdmc+",
-        "data:image/svg+xml;base64,PHN2ZyB3aWR0aD0iNDAwIiBoZWlnaHQ9IjMwMCIgeG1sbnM9Imh0dHA6Ly93d3cudzMub3JnLzIwMDAvc3ZnIj4KPHJlY3Qgd2lkdGg9IjQwMCIgaGVpZ2h0PSIzMDAiIGZpbGw9IiNmZWY5ZTciLz4KPHRleHQgeD0iMjAwIiB5PSIxNTAiIGZvbnQtZmFtaWx5PSJBcmlhbCwgc2Fucy1zZXJpZiIgZm9udC1zaXplPSIyNCIgZmlsbD0iIzM3NDE1MSIgdGV4dC1hbmNob3I9Im1pZGRsZSI+V2ViIERldmVsb3BtZW50PC90ZXh0Pgo8L3N2Zz4K"
+        placeholder_data_url("Kitchen Renovation", "#f0f4f8"),
+        placeholder_data_url("Plumbing Work", "#edf4ff"),
+        placeholder_data_url("Web Development", "#fef9e7")
     ]
     
     # Create demo user for requests
@@ -1869,7 +2735,7 @@ async def initialize_comprehensive_sample_data():
         "id": str(uuid.uuid4()),
         "email": "demo@bidme.com",
         "phone": "(555) 000-0000", 
-        "password_hash": get_password_hash("demopassword"),
+        "password_hash": await get_password_hash("demopassword"),
         "roles": ["customer"],
         "first_name": "Demo",
         "last_name": "User",
@@ -1931,7 +2797,7 @@ async def initialize_comprehensive_sample_data():
                 "id": str(uuid.uuid4()),
                 "email": f"provider{i+1}@bidme.com",
                 "phone": provider_data["phone"],
-                "password_hash": get_password_hash("providerpassword"),
+                "password_hash": await get_password_hash("providerpassword"),
                 "roles": ["customer", "provider"],
                 "first_name": provider_data["business_name"].split()[0],
                 "last_name": "Provider",
@@ -1944,7 +2810,7 @@ async def initialize_comprehensive_sample_data():
     
     # Insert all providers
     for provider_data in sample_providers:
-        provider = ServiceProvider(**provider_data)
+        provider = ServiceProvider(**provider_data, **normalize_location(provider_data["location"]))
         await db.service_providers.insert_one(provider.dict())
     
     # Create 50+ service requests with images
@@ -2014,6 +2880,7 @@ async def initialize_comprehensive_sample_data():
         request_data = {
             "id": str(uuid.uuid4()),
             "user_id": demo_user_id,
+            "user_name": display_name(demo_user),
             "title": title,
             "description": description,
             "category": services[i % len(services)],
@@ -2034,6 +2901,7 @@ async def initialize_comprehensive_sample_data():
     for request_data in sample_requests:
         request_map[request_data["title"]] = request_data["id"]
         request = ServiceRequest(**request_data)
+        derive_request_fields(request)
         await db.service_requests.insert_one(request.dict())
     
     # Create bids for first 20 requests
@@ -2070,17 +2938,60 @@ async def initialize_comprehensive_sample_data():
     print(f"   - Demo customer: demo@bidme.com / demopassword")
     print(f"   - Provider accounts: provider1@bidme.com through provider10@bidme.com / providerpassword")
 
+async def drop_index_if_exists(collection, name: str):
+    if name in await collection.index_information():
+        await collection.drop_index(name)
+
+# Indexes create_bid relies on for correctness, once they are known to exist
+BID_UNIQUE_INDEX = "service_request_provider_unique"
+ensured_indexes = set()
+
+async def create_unique_bid_index():
+    """One bid per provider per request; also serves lookups by service_request_id"""
+    try:
+        await db.bids.create_index(
+            [("service_request_id", 1), ("provider_id", 1)],
+            unique=True,
+            name=BID_UNIQUE_INDEX
+        )
+    except OperationFailure as e:
+        # Duplicates left by earlier races must be resolved by hand first;
+        # until then (and a restart) create_bid checks for duplicates itself
+        print(f"⚠️ Warning: Could not create unique bid index, falling back to per-bid duplicate checks: {e}")
+        return
+    ensured_indexes.add(BID_UNIQUE_INDEX)
+    await drop_index_if_exists(db.bids, "service_request_id_1")
+
 async def create_database_indexes():
     """Create database indexes for improved query performance"""
     try:
         # Service requests indexes
         await db.service_requests.create_index([("category", 1)])
         await db.service_requests.create_index([("status", 1)])
-        await db.service_requests.create_index([("location", "text")])
+        # A collection may only have one text index; the old location text
+        # index (never used by a query) blocked the title/description one.
+        await drop_index_if_exists(db.service_requests, "location_text")
+        await db.service_requests.create_index([("location_city", 1), ("location_state", 1)])
+        await db.service_requests.create_index([("location_tokens", 1)])
         await db.service_requests.create_index([("created_at", -1)])
         await db.service_requests.create_index([("deadline", 1)])
         await db.service_requests.create_index([("budget_min", 1), ("budget_max", 1)])
-        await db.service_requests.create_index([("user_id", 1)])
+        # A user's own requests, newest first (my-requests), with id as keyset tiebreaker
+        await db.service_requests.create_index([("user_id", 1), ("created_at", -1), ("id", -1)])
+        await drop_index_if_exists(db.service_requests, "user_id_1")
+        await db.service_requests.create_index([("id", 1)], unique=True)
+        await db.service_requests.create_index([("geo", "2dsphere")])
+        # Listing sorts tie-break on id, so these end in it (replacing versions without)
+        await drop_index_if_exists(db.service_requests, "subcategory_1_status_1_created_at_-1")
+        await drop_index_if_exists(db.service_requests, "category_1_subcategory_1_status_1_created_at_-1")
+        await db.service_requests.create_index([("subcategory", 1), ("status", 1), ("created_at", -1), ("id", -1)])
+        await db.service_requests.create_index([
+            ("category", 1), ("subcategory", 1), ("status", 1), ("created_at", -1), ("id", -1)
+        ])
+        
+        # Keyset pagination indexes: every sortable field with id as tiebreaker
+        for sort_field in SERVICE_REQUEST_SORT_FIELDS + [URGENCY_SORT_FIELD]:
+            await db.service_requests.create_index([(sort_field, 1), ("id", 1)])
         
         # Create text index for search functionality
         await db.service_requests.create_index([
@@ -2090,20 +3001,31 @@ async def create_database_indexes():
         
         # Service providers indexes
         await db.service_providers.create_index([("services", 1)])
-        await db.service_providers.create_index([("location", "text")])
+        await drop_index_if_exists(db.service_providers, "location_text")
+        await db.service_providers.create_index([("location_city", 1), ("location_state", 1)])
+        await db.service_providers.create_index([("location_tokens", 1)])
         await db.service_providers.create_index([("google_rating", -1)])
         await db.service_providers.create_index([("verified", 1)])
         
         # Bids indexes
-        await db.bids.create_index([("service_request_id", 1)])
-        await db.bids.create_index([("provider_id", 1)])
+        await create_unique_bid_index()
+        await db.bids.create_index([("id", 1)], unique=True)
+        # A provider's bids, newest first (my-bids), with id as keyset tiebreaker
+        await db.bids.create_index([("provider_id", 1), ("created_at", -1), ("id", -1)])
+        await drop_index_if_exists(db.bids, "provider_id_1")
         await db.bids.create_index([("created_at", -1)])
         await db.bids.create_index([("price", 1)])
+        # Paginated bid lists of one request, with id as keyset tiebreaker
+        for sort_field in BID_SORT_FIELDS:
+            await db.bids.create_index([("service_request_id", 1), (sort_field, 1), ("id", 1)])
         
         # Users indexes
         await db.users.create_index([("email", 1)], unique=True)
         await db.users.create_index([("id", 1)], unique=True)
         
+        # Image store: one file per content hash
+        await image_store.create_indexes()
+        
         print("✅ Database indexes created successfully for improved performance")
         
     except Exception as e:
@@ -2119,6 +3041,7 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Configure logging
@@ -2130,4 +3053,7 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    reconciler = getattr(app.state, "stats_reconciler", None)
+    if reconciler:
+        reconciler.cancel()
     client.close()
\ No newline at end of file
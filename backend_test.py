@@ -1,6 +1,7 @@
 import requests
 import sys
 import json
+import time
 from datetime import datetime, timedelta
 
 class ServiceConnectAPITester:
@@ -232,6 +233,69 @@ class ServiceConnectAPITester:
             token=self.customer_token
         )
 
+    def test_my_requests_pagination_and_filters(self):
+        """Test cursor pagination, status filter and image projection on my-requests"""
+        print("\n📄 Testing My Requests Pagination...")
+        url = f"{self.base_url}/my-requests"
+        headers = {'Authorization': f'Bearer {self.customer_token}'}
+        self.tests_run += 1
+        try:
+            first = requests.get(url, headers=headers, params={"limit": 1})
+            next_cursor = first.headers.get("X-Next-Cursor")
+            if first.status_code != 200 or len(first.json()) != 1 or not next_cursor:
+                print(f"❌ Failed - First page status {first.status_code}, cursor {next_cursor}")
+                return False
+            request = first.json()[0]
+            if "images" in request or "image_count" not in request or "bid_count" not in request:
+                print("❌ Failed - List view should carry image_count and bid_count instead of images")
+                return False
+            second = requests.get(url, headers=headers, params={"limit": 1, "cursor": next_cursor})
+            if second.status_code != 200 or any(req["id"] == request["id"] for req in second.json()):
+                print(f"❌ Failed - Second page status {second.status_code} repeats the first page")
+                return False
+            in_progress = requests.get(url, headers=headers, params={"status": "in_progress"}).json()
+            if not in_progress or any(req["status"] != "in_progress" for req in in_progress):
+                print("❌ Failed - Status filter returned other statuses")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - Paged and filtered own requests")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
+    def test_profile_name_propagation(self):
+        """Test that a renamed customer's name reaches their existing requests"""
+        if not self.service_request_id:
+            print("❌ No service request ID to test")
+            return False
+        
+        success, _ = self.run_test(
+            "Update User Profile Name",
+            "PUT",
+            "user/profile",
+            200,
+            data={"first_name": "Renamed", "last_name": "Customer"},
+            token=self.customer_token
+        )
+        if not success:
+            return False
+        
+        # The name is rewritten by a background task after the response, so poll for it
+        print("\n🔍 Testing Service Request Shows New Owner Name...")
+        self.tests_run += 1
+        request = {}
+        for _ in range(20):
+            response = requests.get(f"{self.base_url}/service-requests/{self.service_request_id}")
+            request = response.json() if response.status_code == 200 else {}
+            if request.get("user_name") == "Renamed Customer":
+                self.tests_passed += 1
+                print("   ✅ Owner name propagated to the service request")
+                return True
+            time.sleep(0.25)
+        print(f"   ❌ Owner name not propagated: {request.get('user_name')}")
+        return False
+
     def test_create_provider_profile(self):
         """Test creating provider profile"""
         profile_data = {
@@ -305,6 +369,81 @@ class ServiceConnectAPITester:
             return True
         return False
 
+    def test_duplicate_bid_rejected(self):
+        """Test that concurrent bids from one provider on one request leave a single bid"""
+        if not self.service_request_id:
+            print("❌ No service request ID to bid on")
+            return False
+        
+        from concurrent.futures import ThreadPoolExecutor
+        
+        bid_data = {
+            "service_request_id": self.service_request_id,
+            "price": 140.0,
+            "proposal": "Second offer from the same provider"
+        }
+        headers = {'Content-Type': 'application/json', 'Authorization': f'Bearer {self.provider_token}'}
+        self.tests_run += 1
+        print(f"\n🔍 Testing Duplicate Bid Rejection...")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            responses = list(pool.map(
+                lambda _: requests.post(f"{self.base_url}/bids", json=bid_data, headers=headers),
+                range(4)
+            ))
+        
+        # test_create_bid already placed this provider's bid, so every attempt must fail
+        statuses = [response.status_code for response in responses]
+        if statuses == [400] * 4:
+            self.tests_passed += 1
+            print(f"✅ Passed - All duplicate submissions rejected")
+            return True
+        print(f"❌ Failed - Expected four 400 responses, got {statuses}")
+        return False
+
+    def test_concurrent_bid_acceptance(self):
+        """Test that only one of several concurrent accepts on a request succeeds"""
+        from concurrent.futures import ThreadPoolExecutor
+        
+        success, request = self.run_test(
+            "Create Request For Acceptance",
+            "POST",
+            "service-requests",
+            200,
+            data={
+                "title": "Fence Repair",
+                "description": "Two fence panels need replacing",
+                "category": "Home Services",
+                "location": "Denver, CO"
+            },
+            token=self.customer_token
+        )
+        if not success:
+            return False
+        success, bid = self.run_test(
+            "Bid On Request For Acceptance",
+            "POST",
+            "bids",
+            200,
+            data={"service_request_id": request["id"], "price": 300.0, "proposal": "Same-week repair"},
+            token=self.provider_token
+        )
+        if not success:
+            return False
+        
+        headers = {'Authorization': f'Bearer {self.customer_token}'}
+        url = f"{self.base_url}/service-requests/{request['id']}/accept-bid/{bid['id']}"
+        self.tests_run += 1
+        print(f"\n🔍 Testing Concurrent Bid Acceptance...")
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            statuses = sorted(pool.map(lambda _: requests.post(url, headers=headers).status_code, range(4)))
+        
+        if statuses == [200, 400, 400, 400]:
+            self.tests_passed += 1
+            print(f"✅ Passed - Exactly one accept succeeded")
+            return True
+        print(f"❌ Failed - Expected one 200 and three 400 responses, got {statuses}")
+        return False
+
     def test_get_bids_for_request_as_owner(self):
         """Test getting bids for request as request owner"""
         if not self.service_request_id:
@@ -319,6 +458,36 @@ class ServiceConnectAPITester:
             token=self.customer_token
         )
 
+    def test_bids_for_request_pagination(self):
+        """Test cursor pagination and summary projection of a request's bids"""
+        if not self.service_request_id:
+            print("❌ No service request ID to get bids for")
+            return False
+        
+        print("\n📄 Testing Bid List Pagination...")
+        url = f"{self.base_url}/service-requests/{self.service_request_id}/bids"
+        headers = {'Authorization': f'Bearer {self.customer_token}'}
+        self.tests_run += 1
+        try:
+            first = requests.get(url, headers=headers, params={"limit": 1, "sort_by": "price", "sort_order": "asc", "summary": True})
+            next_cursor = first.headers.get("X-Next-Cursor")
+            if first.status_code != 200 or len(first.json()) != 1 or not next_cursor:
+                print(f"❌ Failed - First page status {first.status_code}, cursor {next_cursor}")
+                return False
+            if "proposal" in first.json()[0]:
+                print("❌ Failed - Summary view still carries the proposal")
+                return False
+            second = requests.get(url, headers=headers, params={"limit": 1, "sort_by": "price", "sort_order": "asc", "cursor": next_cursor})
+            if second.status_code != 200 or any(bid["id"] == first.json()[0]["id"] for bid in second.json()):
+                print(f"❌ Failed - Second page status {second.status_code} repeats the first page")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - Paged through bids without overlap")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
     def test_get_bids_for_request_as_bidder(self):
         """Test getting bids for request as bidder"""
         if not self.service_request_id:
@@ -343,6 +512,40 @@ class ServiceConnectAPITester:
             token=self.provider_token
         )
 
+    def test_my_bids_pagination_and_filters(self):
+        """Test cursor pagination and status/category filters on my-bids"""
+        print("\n📄 Testing My Bids Pagination...")
+        url = f"{self.base_url}/my-bids"
+        headers = {'Authorization': f'Bearer {self.provider_token}'}
+        self.tests_run += 1
+        try:
+            first = requests.get(url, headers=headers, params={"limit": 1})
+            next_cursor = first.headers.get("X-Next-Cursor")
+            if first.status_code != 200 or len(first.json()) != 1 or not next_cursor:
+                print(f"❌ Failed - First page status {first.status_code}, cursor {next_cursor}")
+                return False
+            if "service_title" not in first.json()[0]:
+                print("❌ Failed - Bid is missing its service request title")
+                return False
+            second = requests.get(url, headers=headers, params={"limit": 1, "cursor": next_cursor})
+            if second.status_code != 200 or any(bid["id"] == first.json()[0]["id"] for bid in second.json()):
+                print(f"❌ Failed - Second page status {second.status_code} repeats the first page")
+                return False
+            accepted = requests.get(url, headers=headers, params={"status": "accepted"}).json()
+            if any(bid["status"] != "accepted" for bid in accepted):
+                print("❌ Failed - Status filter returned other statuses")
+                return False
+            home = requests.get(url, headers=headers, params={"category": "Home Services"}).json()
+            if not home or any(bid.get("service_category") != "Home Services" for bid in home):
+                print("❌ Failed - Category filter returned other categories")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - Paged and filtered provider bids")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
     def test_create_bid_message_from_provider(self):
         """Test creating bid message from provider"""
         if not self.bid_id:
@@ -601,6 +804,35 @@ class ServiceConnectAPITester:
             print(f"❌ Failed - Error: {str(e)}")
             return False
 
+    def test_image_download_caching(self):
+        """Test streamed image download with ETag revalidation and byte ranges"""
+        if not self.uploaded_image or not self.uploaded_image.startswith("/api/images/"):
+            print("❌ No stored image to download")
+            return False
+        
+        url = self.base_url[:-len("/api")] + self.uploaded_image
+        self.tests_run += 1
+        print(f"\n🔍 Testing Image Download...")
+        print(f"   URL: {url}")
+        
+        try:
+            full = requests.get(url)
+            etag = full.headers.get("ETag")
+            revalidated = requests.get(url, headers={"If-None-Match": etag or ""})
+            partial = requests.get(url, headers={"Range": "bytes=0-9"})
+            if full.status_code != 200 or not etag or revalidated.status_code != 304:
+                print(f"❌ Failed - Download {full.status_code}, ETag {etag}, revalidation {revalidated.status_code}")
+                return False
+            if partial.status_code != 206 or partial.content != full.content[:10]:
+                print(f"❌ Failed - Range request returned {partial.status_code}")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - {len(full.content)} bytes, ETag {etag}, ranges supported")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
     def test_service_request_with_images(self):
         """Test creating service request with images"""
         if not self.uploaded_image:
@@ -633,6 +865,39 @@ class ServiceConnectAPITester:
             return True
         return False
 
+    def test_request_image_external_url_not_redirected(self):
+        """Test that a request image stored as an external URL is not redirected to"""
+        print("\n🔍 Testing Request Image External URL...")
+        self.tests_run += 1
+        try:
+            response = requests.post(
+                f"{self.base_url}/service-requests",
+                json={
+                    "title": "Request with External Image",
+                    "description": "Testing that image URLs cannot redirect off-site",
+                    "category": "Home Services",
+                    "location": "Austin, TX",
+                    "images": ["https://evil.example.com/phish.png"]
+                },
+                headers={"Authorization": f"Bearer {self.customer_token}"}
+            )
+            if response.status_code != 200:
+                print(f"❌ Failed - Creating the request returned {response.status_code}")
+                return False
+            image = requests.get(
+                f"{self.base_url}/service-requests/{response.json()['id']}/images/0",
+                allow_redirects=False
+            )
+            if image.status_code != 404:
+                print(f"❌ Failed - Expected 404, got {image.status_code} ({image.headers.get('Location')})")
+                return False
+            self.tests_passed += 1
+            print("✅ Passed - External image URL answered with 404, not a redirect")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
     def test_ai_recommendations_basic(self):
         """Test AI recommendations endpoint with basic request"""
         recommendation_data = {
@@ -1198,6 +1463,39 @@ class ServiceConnectAPITester:
             print("   ❌ Failed to get updated counts")
             return False
 
+    def test_marketplace_stats(self):
+        """Test that /stats rollups follow newly created service requests"""
+        print("\n📈 Testing Marketplace Stats...")
+        
+        success1, initial_stats = self.run_test("Marketplace Stats - Initial", "GET", "stats", 200)
+        if not success1:
+            return False
+        
+        success2, _ = self.run_test(
+            "Marketplace Stats - Create Service Request",
+            "POST",
+            "service-requests",
+            200,
+            data={
+                "title": "Marketplace Stats Test Service",
+                "description": "Testing that marketplace stats update incrementally",
+                "category": "Home Services",
+                "location": "Austin, TX"
+            },
+            token=self.customer_token
+        )
+        success3, updated_stats = self.run_test("Marketplace Stats - Updated", "GET", "stats", 200)
+        if not (success2 and success3):
+            return False
+        
+        before = initial_stats.get("open_requests_by_category", {}).get("Home Services", 0)
+        after = updated_stats.get("open_requests_by_category", {}).get("Home Services", 0)
+        if after == before + 1 and updated_stats["open_requests"] == initial_stats["open_requests"] + 1:
+            print(f"   ✅ Open Home Services requests: {before} → {after}")
+            return True
+        print(f"   ❌ Open Home Services requests did not increase by one: {before} → {after}")
+        return False
+
     # NEW ENHANCED FEATURES TESTING
     def test_enhanced_subcategories(self):
         """Test the new enhanced subcategories endpoints"""
@@ -1378,6 +1676,106 @@ class ServiceConnectAPITester:
         
         return all_success
 
+    def test_service_requests_cursor_pagination(self):
+        """Test keyset pagination via the X-Next-Cursor header"""
+        print("\n📄 Testing Cursor Pagination...")
+        url = f"{self.base_url}/service-requests"
+        self.tests_run += 1
+        try:
+            first = requests.get(url, params={"limit": 5, "sort_by": "budget_min", "sort_order": "asc"})
+            next_cursor = first.headers.get("X-Next-Cursor")
+            if first.status_code != 200 or not next_cursor:
+                print(f"❌ Failed - First page status {first.status_code}, cursor {next_cursor}")
+                return False
+            second = requests.get(url, params={"limit": 5, "sort_by": "budget_min", "sort_order": "asc", "cursor": next_cursor})
+            first_ids = {req["id"] for req in first.json()}
+            second_ids = {req["id"] for req in second.json()}
+            if second.status_code != 200 or first_ids & second_ids:
+                print(f"❌ Failed - Second page status {second.status_code}, overlap {first_ids & second_ids}")
+                return False
+            mismatched = requests.get(url, params={"limit": 5, "sort_by": "title", "cursor": next_cursor})
+            if mismatched.status_code != 400:
+                print(f"❌ Failed - Cursor reused with another sort returned {mismatched.status_code}")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - Pages of {len(first_ids)} and {len(second_ids)} requests without overlap")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
+    def test_location_filter_on_seed_data(self):
+        """Test that seeded requests are found by the normalized location filter"""
+        print("\n📍 Testing Location Filter on Seed Data...")
+        url = f"{self.base_url}/service-requests"
+        self.tests_run += 1
+        try:
+            for location in ("Houston, TX", "Houston", "hous"):
+                response = requests.get(url, params={"location": location, "limit": 50})
+                found = response.json() if response.status_code == 200 else []
+                if not found or any("houston" not in req["location"].lower() for req in found):
+                    print(f"❌ Failed - location={location!r} returned {len(found)} requests")
+                    return False
+            self.tests_passed += 1
+            print(f"✅ Passed - Seeded Houston requests found by city, bare name and prefix")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
+    def test_service_requests_urgency_sort(self):
+        """Test that sort_by=urgency lists the nearest deadline first and undated requests last"""
+        print("\n⏰ Testing Urgency Sort...")
+        url = f"{self.base_url}/service-requests"
+        self.tests_run += 1
+        try:
+            deadlines = []
+            cursor = None
+            for _ in range(3):
+                params = {"limit": 100, "sort_by": "urgency", "sort_order": "desc"}
+                if cursor:
+                    params["cursor"] = cursor
+                response = requests.get(url, params=params)
+                if response.status_code != 200:
+                    print(f"❌ Failed - Status {response.status_code}")
+                    return False
+                deadlines += [req.get("deadline") for req in response.json()]
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
+                    break
+            dated = [deadline for deadline in deadlines if deadline]
+            first_undated = deadlines.index(None) if None in deadlines else len(deadlines)
+            if dated != sorted(dated) or any(deadlines[first_undated:]):
+                print("❌ Failed - Requests are not ordered by deadline with undated ones last")
+                return False
+            self.tests_passed += 1
+            print(f"✅ Passed - {len(dated)} dated requests in deadline order before {len(deadlines) - len(dated)} undated")
+            return True
+        except Exception as e:
+            print(f"❌ Failed - Error: {str(e)}")
+            return False
+
+    def test_service_requests_envelope(self):
+        """Test the envelope listing with total and facet counts"""
+        success, data = self.run_test(
+            "Service Requests Envelope",
+            "GET",
+            "service-requests",
+            200,
+            params={"envelope": "true", "status": "open", "limit": 5}
+        )
+        if not success:
+            return False
+        facets = data.get("facets", {})
+        if len(data.get("items", [])) > 5 or data.get("total", 0) < len(data.get("items", [])):
+            print(f"   ❌ Inconsistent page and total: {len(data.get('items', []))} items, total {data.get('total')}")
+            return False
+        if sum(facets.get("category", {}).values()) != data["total"] or set(facets.get("status", {})) - {"open"}:
+            print(f"   ❌ Facets do not match the filter: {facets}")
+            return False
+        print(f"   ✅ Total {data['total']} open requests across {len(facets['category'])} categories")
+        return True
+
     def test_enhanced_response_data(self):
         """Test that service requests include enhanced response data"""
         print("\n🔍 Testing Enhanced Response Data...")
@@ -1935,6 +2333,48 @@ class ServiceConnectAPITester:
             401
         )
         
+        # Exports are for admins only
+        for export in ("service-requests", "bids", "service-providers"):
+            self.run_test(
+                f"Unauthenticated {export} Export",
+                "GET",
+                f"admin/export/{export}",
+                401
+            )
+        self.run_test(
+            "Customer Trying to Export Bids",
+            "GET",
+            "admin/export/bids",
+            403,
+            params={"format": "csv"},
+            token=self.customer_token
+        )
+        # The admin role cannot be claimed at registration
+        timestamp = datetime.now().strftime('%H%M%S%f')
+        self.run_test(
+            "Registering as Admin",
+            "POST",
+            "auth/register",
+            400,
+            data={
+                "email": f"admin_{timestamp}@test.com",
+                "phone": f"555-{timestamp[:6]}",
+                "password": "TestPass123!",
+                "role": "admin",
+                "first_name": "Would-be",
+                "last_name": "Admin"
+            }
+        )
+        
+        # Coordinates out of range are rejected before reaching the database
+        self.run_test(
+            "Out-of-Range Latitude",
+            "GET",
+            "service-requests",
+            422,
+            params={"latitude": 200, "longitude": -97.7, "distance_km": 10}
+        )
+        
         # Test customer trying to create bid
         if self.service_request_id:
             bid_data = {
@@ -2009,6 +2449,7 @@ def main():
     # NEW: Image Upload Tests
     print("\n🖼️  Testing Image Upload...")
     tester.test_image_upload()
+    tester.test_image_download_caching()
     
     # Service request tests
     print("\n📝 Testing Service Requests...")
@@ -2018,9 +2459,11 @@ def main():
     
     # NEW: Service request with images
     tester.test_service_request_with_images()
+    tester.test_request_image_external_url_not_redirected()
     
     tester.test_get_service_request_detail()
     tester.test_get_my_requests()
+    tester.test_profile_name_propagation()
     
     # Provider profile tests
     print("\n👔 Testing Provider Profiles...")
@@ -2034,9 +2477,14 @@ def main():
         print("❌ Bid creation failed, stopping bid-related tests")
         return 1
     
+    tester.test_duplicate_bid_rejected()
+    tester.test_concurrent_bid_acceptance()
     tester.test_get_bids_for_request_as_owner()
     tester.test_get_bids_for_request_as_bidder()
+    tester.test_bids_for_request_pagination()
     tester.test_get_my_bids()
+    tester.test_my_bids_pagination_and_filters()
+    tester.test_my_requests_pagination_and_filters()
     
     # Bid messaging tests
     print("\n💬 Testing Bid Messaging...")
@@ -2062,11 +2510,16 @@ def main():
     tester.test_ai_category_selection_validation()
     tester.test_ai_category_selection_integration()
     tester.test_dashboard_count_updates()
+    tester.test_marketplace_stats()
     
     # NEW ENHANCED FEATURES TESTING (REVIEW REQUEST FOCUS)
     print("\n🚀 Testing Enhanced ServiceConnect Features (REVIEW REQUEST FOCUS)...")
     tester.test_enhanced_subcategories()
     tester.test_enhanced_service_request_filtering()
+    tester.test_service_requests_cursor_pagination()
+    tester.test_location_filter_on_seed_data()
+    tester.test_service_requests_urgency_sort()
+    tester.test_service_requests_envelope()
     tester.test_enhanced_response_data()
     tester.test_comprehensive_sample_data()
     
@@ -0,0 +1,119 @@
+"""Measure per-accept latency of a request with 1,000 sibling bids.
+
+"sequential" is what accept_bid used to do: find the request and the bid,
+then update the bid, the request and the sibling bids one call at a time.
+"guarded" is perform_bid_acceptance: a compare-and-set on the request, then
+one bulk write on its bids.
+
+Needs a running MongoDB. Every run gets a freshly seeded request, in a
+scratch database that is dropped afterwards. Run from the repository root:
+
+    MONGO_URL=mongodb://localhost:27017 python benchmarks/bench_accept_bid.py [--bids 1000] [--runs 30]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from bid_acceptance import perform_bid_acceptance
+
+OWNER_ID = "benchmark-owner"
+
+
+async def seed(db, bids: int) -> tuple:
+    request_id = str(uuid.uuid4())
+    now = datetime.utcnow()
+    await db.service_requests.insert_one({
+        "id": request_id, "user_id": OWNER_ID, "title": "Benchmark request",
+        "category": "Home Services", "status": "open", "created_at": now
+    })
+    bid_ids = [str(uuid.uuid4()) for _ in range(bids)]
+    await db.bids.insert_many([
+        {
+            "id": bid_id, "service_request_id": request_id, "provider_id": str(uuid.uuid4()),
+            "price": 100.0 + i, "proposal": "Benchmark proposal " * 20, "status": "pending",
+            "created_at": now, "updated_at": now
+        }
+        for i, bid_id in enumerate(bid_ids)
+    ])
+    return request_id, bid_ids[len(bid_ids) // 2]
+
+
+async def sequential_accept(db, request_id: str, bid_id: str):
+    request = await db.service_requests.find_one({"id": request_id})
+    assert request["user_id"] == OWNER_ID and request["status"] == "open"
+    bid = await db.bids.find_one({"id": bid_id, "service_request_id": request_id})
+    assert bid
+    await db.bids.update_one({"id": bid_id}, {"$set": {"status": "accepted", "updated_at": datetime.utcnow()}})
+    await db.service_requests.update_one(
+        {"id": request_id},
+        {"$set": {"status": "in_progress", "accepted_bid_id": bid_id, "updated_at": datetime.utcnow()}}
+    )
+    await db.bids.update_many(
+        {"service_request_id": request_id, "id": {"$ne": bid_id}},
+        {"$set": {"status": "rejected", "updated_at": datetime.utcnow()}}
+    )
+
+
+async def guarded_accept(db, request_id: str, bid_id: str):
+    await perform_bid_acceptance(db, request_id, bid_id, OWNER_ID)
+
+
+async def measure(db, accept, bids: int, runs: int) -> list:
+    timings = []
+    for _ in range(runs):
+        request_id, bid_id = await seed(db, bids)
+        start = time.perf_counter()
+        await accept(db, request_id, bid_id)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert await db.bids.count_documents({"service_request_id": request_id, "status": "rejected"}) == bids - 1
+    return timings
+
+
+async def run(args):
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017"))
+    db = client[args.database]
+    try:
+        # The indexes create_database_indexes builds for these lookups
+        await db.service_requests.create_index([("id", 1)], unique=True)
+        await db.bids.create_index(
+            [("service_request_id", 1), ("provider_id", 1)],
+            unique=True,
+            name="service_request_provider_unique"
+        )
+        await db.bids.create_index([("id", 1)], unique=True)
+
+        results = {
+            "sequential": await measure(db, sequential_accept, args.bids, args.runs),
+            "guarded": await measure(db, guarded_accept, args.bids, args.runs)
+        }
+    finally:
+        await client.drop_database(args.database)
+        client.close()
+
+    print(f"{args.bids} sibling bids per request, {args.runs} runs")
+    for name, timings in results.items():
+        print(f"{name:>10}: median {statistics.median(timings):7.2f} ms   "
+              f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--bids", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--database", default="bidme_benchmark")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
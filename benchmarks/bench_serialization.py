@@ -0,0 +1,99 @@
+"""Compare the JSON encoding paths for a 1,000-document listing page.
+
+"current" is what list endpoints used to do: serialize_mongo_doc, then
+FastAPI's jsonable_encoder and JSONResponse. "orjson" is MongoJSONResponse
+rendering the raw documents.
+
+Run from the repository root:
+
+    python benchmarks/bench_serialization.py [--documents 1000] [--runs 50]
+"""
+import argparse
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import orjson
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from responses import MongoJSONResponse, serialize_mongo_doc
+
+
+def make_page(documents: int) -> list:
+    now = datetime(2025, 1, 1, 12, 30, 15, 123000)
+    return [
+        {
+            "_id": ObjectId(),
+            "id": str(uuid.uuid4()),
+            "user_id": str(uuid.uuid4()),
+            "title": f"Service request {i}",
+            "description": "Need help with a kitchen renovation, including cabinets and flooring. " * 3,
+            "category": "Construction & Renovation",
+            "subcategory": "Kitchen Remodeling",
+            "budget_min": 500.0 + i,
+            "budget_max": 2500.0 + i,
+            "deadline": now + timedelta(days=i % 30),
+            "location": "Austin, TX",
+            "status": "open",
+            "show_best_bids": i % 2 == 0,
+            "created_at": now - timedelta(minutes=i),
+            "images": [f"/api/images/{uuid.uuid4().hex}" for _ in range(i % 4)],
+            "geo": {"type": "Point", "coordinates": [-97.7431, 30.2672]},
+            "bid_count": i % 7,
+            "avg_bid_price": 1200.5,
+            "user_name": "Jane Customer"
+        }
+        for i in range(documents)
+    ]
+
+
+def current_path(page: list) -> bytes:
+    return JSONResponse(jsonable_encoder(serialize_mongo_doc(page))).body
+
+
+def orjson_path(page: list) -> bytes:
+    return MongoJSONResponse(page).body
+
+
+def measure(render, pages: list) -> list:
+    timings = []
+    for page in pages:
+        start = time.perf_counter()
+        render(page)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    # Both paths must produce the same JSON document
+    sample = make_page(args.documents)
+    expected = current_path(sample)
+    assert orjson.loads(expected) == orjson.loads(orjson_path(sample))
+
+    # MongoJSONResponse strips _id in place, so every run gets its own page
+    results = {
+        "current": measure(current_path, [make_page(args.documents) for _ in range(args.runs)]),
+        "orjson": measure(orjson_path, [make_page(args.documents) for _ in range(args.runs)])
+    }
+    print(f"{args.documents} documents per page, {args.runs} runs")
+    for name, timings in results.items():
+        print(f"{name:>8}: median {statistics.median(timings):7.2f} ms   "
+              f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms")
+    speedup = statistics.median(results["current"]) / statistics.median(results["orjson"])
+    print(f" speedup: {speedup:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
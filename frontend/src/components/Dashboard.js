@@ -61,23 +61,20 @@ const Dashboard = () => {
       const isCustomer = userRoles.includes('customer');
       const isProvider = userRoles.includes('provider');
       
-      const [requestsResponse, myRequestsResponse, myBidsResponse, providersResponse, completedResponse] = await Promise.all([
-        axios.get(`${API}/service-requests?status=open&limit=500`), // Get up to 500 open requests
+      const [statsResponse, recentResponse, myRequestsResponse, myBidsResponse] = await Promise.all([
+        axios.get(`${API}/stats`), // Marketplace totals from server-side rollups
+        axios.get(`${API}/service-requests?status=open&limit=3`),
         isCustomer ? axios.get(`${API}/my-requests`) : Promise.resolve({ data: [] }),
-        isProvider ? axios.get(`${API}/my-bids`) : Promise.resolve({ data: [] }),
-        axios.get(`${API}/service-providers?limit=1000`), // Get up to 1000 providers
-        axios.get(`${API}/service-requests?status=completed&limit=500`) // Get completed projects
+        isProvider ? axios.get(`${API}/my-bids`) : Promise.resolve({ data: [] })
       ]);
 
-      const verifiedCount = providersResponse.data.filter(provider => provider.verified).length;
-
       setStats({
-        totalRequests: requestsResponse.data.length,
+        totalRequests: statsResponse.data.open_requests,
         myRequests: myRequestsResponse.data.length,
         myBids: myBidsResponse.data.length,
-        recentRequests: requestsResponse.data.slice(0, 3),
-        completedProjects: completedResponse.data.length,
-        verifiedProfessionals: verifiedCount
+        recentRequests: recentResponse.data,
+        completedProjects: statsResponse.data.completed_projects,
+        verifiedProfessionals: statsResponse.data.verified_providers
       });
     } catch (error) {
       console.error('Failed to fetch dashboard data:', error);
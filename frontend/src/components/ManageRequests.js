@@ -86,11 +86,21 @@ const ManageRequests = () => {
     }
   };
 
-  const handleEditRequest = (request) => {
+  const handleEditRequest = async (request) => {
+    // The request list leaves out images; load them so saving keeps them
+    let images = [];
+    try {
+      const response = await axios.get(`${API}/service-requests/${request.id}`);
+      images = response.data.images || [];
+    } catch (error) {
+      console.error('Failed to load request images:', error);
+      alert('Failed to load request. Please try again.');
+      return;
+    }
     setEditingRequest({
       ...request,
       deadline: request.deadline ? new Date(request.deadline).toISOString().slice(0, 16) : '',
-      images: request.images || []
+      images
     });
   };
 
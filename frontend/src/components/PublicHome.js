@@ -22,31 +22,21 @@ const PublicHome = () => {
 
   const fetchPublicData = async () => {
     try {
-      const [requestsResponse, categoriesResponse, providersResponse] = await Promise.all([
-        axios.get(`${API}/service-requests?status=open&limit=500`), // Get up to 500 open requests
+      const [statsResponse, requestsResponse, categoriesResponse, providersResponse] = await Promise.all([
+        axios.get(`${API}/stats`), // Marketplace totals from server-side rollups
+        axios.get(`${API}/service-requests?status=open&limit=6`),
         axios.get(`${API}/categories`),
-        axios.get(`${API}/service-providers?limit=1000`) // Get up to 1000 providers
+        axios.get(`${API}/service-providers?limit=12`) // Show top 12 providers
       ]);
 
-      console.log('Fetched data:', {
-        requests: requestsResponse.data.length,
-        providers: providersResponse.data.length
-      });
-
-      // Calculate completed projects (get actual completed count)
-      const completedResponse = await axios.get(`${API}/service-requests?status=completed&limit=500`);
-      const completedProjects = completedResponse.data.length;
-
-      const verifiedCount = providersResponse.data.filter(provider => provider.verified).length;
-
       setStats({
-        totalRequests: requestsResponse.data.length,
-        recentRequests: requestsResponse.data.slice(0, 6),
-        completedProjects: completedProjects,
-        verifiedProfessionals: verifiedCount
+        totalRequests: statsResponse.data.open_requests,
+        recentRequests: requestsResponse.data,
+        completedProjects: statsResponse.data.completed_projects,
+        verifiedProfessionals: statsResponse.data.verified_providers
       });
       setCategories(categoriesResponse.data.categories || []);
-      setServiceProviders(providersResponse.data.slice(0, 12)); // Show top 12 providers instead of 8
+      setServiceProviders(providersResponse.data);
     } catch (error) {
       console.error('Failed to fetch public data:', error);
       // If API fails, don't show any stats rather than fake numbers
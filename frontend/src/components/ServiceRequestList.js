@@ -338,8 +338,9 @@ const ServiceRequestList = () => {
                       onChange={(e) => handleFilterChange('urgency', e.target.value)}
                     >
                       <option value="">All Urgency Levels</option>
-                      <option value="urgent">🔥 Urgent (within 7 days)</option>
-                      <option value="flexible">🕒 Flexible (30+ days)</option>
+                      <option value="urgent">🔥 Urgent (within 3 days)</option>
+                      <option value="moderate">⏳ Moderate (within 14 days)</option>
+                      <option value="flexible">🕒 Flexible (14+ days)</option>
                     </select>
                   </div>
 
@@ -359,6 +360,7 @@ const ServiceRequestList = () => {
                       <option value="budget_max_desc">Highest Budget</option>
                       <option value="budget_min_asc">Lowest Budget</option>
                       <option value="deadline_asc">Deadline Soon</option>
+                      <option value="urgency_desc">Most Urgent</option>
                       <option value="title_asc">Title A-Z</option>
                     </select>
                   </div>
@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+pytest.importorskip("pymongo")
+
+from bid_acceptance import BidAcceptanceError, perform_bid_acceptance
+
+
+class Requests:
+    def __init__(self, request: dict):
+        self.request = request
+
+    async def find_one_and_update(self, query, update, projection=None, return_document=None):
+        if any(self.request.get(field) != value for field, value in query.items()):
+            return None
+        before = dict(self.request)
+        self.request.update(update["$set"])
+        return before
+
+    async def find_one(self, query, projection=None):
+        return dict(self.request) if self.request["id"] == query["id"] else None
+
+    async def update_one(self, query, update):
+        if all(self.request.get(field) == value for field, value in query.items()):
+            for field in update["$unset"]:
+                self.request.pop(field, None)
+
+
+class Bids:
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.writes = 0
+
+    async def find_one(self, query, projection=None):
+        return {"id": query["id"], "price": 100.0}
+
+    async def bulk_write(self, requests, ordered=True):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("write timed out")
+        self.writes += 1
+
+
+class Database:
+    def __init__(self, failures: int = 0):
+        self.service_requests = Requests({"id": "r1", "user_id": "owner", "status": "open", "category": "Home"})
+        self.bids = Bids(failures)
+
+
+def test_retrying_an_interrupted_acceptance_completes_it():
+    async def scenario():
+        database = Database(failures=1)
+        with pytest.raises(ConnectionError):
+            await perform_bid_acceptance(database, "r1", "b1", "owner")
+        assert database.service_requests.request["acceptance_pending"]
+
+        request, bid = await perform_bid_acceptance(database, "r1", "b1", "owner")
+        assert request["status"] == "open" and bid["id"] == "b1"
+        assert database.bids.writes == 1
+        assert "acceptance_pending" not in database.service_requests.request
+        assert database.service_requests.request["status"] == "in_progress"
+
+    asyncio.run(scenario())
+
+
+def test_a_claimed_request_is_not_resumed_for_another_bid_or_user():
+    async def scenario():
+        database = Database(failures=1)
+        with pytest.raises(ConnectionError):
+            await perform_bid_acceptance(database, "r1", "b1", "owner")
+        for bid_id, user_id in (("b2", "owner"), ("b1", "someone-else")):
+            with pytest.raises(BidAcceptanceError) as error:
+                await perform_bid_acceptance(database, "r1", bid_id, user_id)
+            assert error.value.status_code in (400, 403)
+        assert database.bids.writes == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from bid_stats import EMPTY_BID_STATS, bid_stats_increment, bid_stats_repair, bid_stats_summary
+
+
+def evaluate(expression, doc):
+    """The aggregation operators bid_stats_increment uses, as MongoDB applies them"""
+    if isinstance(expression, str) and expression.startswith("$"):
+        return doc.get(expression[1:])
+    if not isinstance(expression, dict):
+        return expression
+    (operator, arguments), = expression.items()
+    values = [evaluate(argument, doc) for argument in arguments]
+    if operator == "$add":
+        return sum(values)
+    if operator == "$ifNull":
+        return values[0] if values[0] is not None else values[1]
+    present = [value for value in values if value is not None]
+    return {"$min": min, "$max": max}[operator](present) if present else None
+
+
+def apply_update(doc: dict, pipeline: list) -> dict:
+    for stage in pipeline:
+        doc = {**doc, **{field: evaluate(expression, doc) for field, expression in stage["$set"].items()}}
+    return doc
+
+
+def test_creating_bids_folds_prices_into_the_statistics():
+    request = {"id": "r1"}  # Stored before the statistics existed
+    for price in (150.0, 90.0, 120.0):
+        request = apply_update(request, bid_stats_increment(price))
+    assert request == {
+        "id": "r1", "bid_count": 3, "bid_price_sum": 360.0, "min_bid_price": 90.0, "max_bid_price": 150.0
+    }
+    assert bid_stats_summary(request) == {
+        "bid_count": 3, "avg_bid_price": 120.0, "min_bid_price": 90.0, "max_bid_price": 150.0
+    }
+    assert request == {"id": "r1"}
+
+
+def test_summary_of_a_request_without_bids():
+    assert bid_stats_summary({"id": "r1"}) == {"bid_count": 0}
+    assert bid_stats_summary({"id": "r1", **EMPTY_BID_STATS}) == {"bid_count": 0}
+
+
+def test_repair_after_bids_were_deleted_guards_every_field():
+    request = {"id": "r1", "bid_count": 2, "bid_price_sum": 250.0, "min_bid_price": 100.0, "max_bid_price": 150.0}
+    update_filter, update = bid_stats_repair(request, None)
+    assert update_filter == request
+    assert update == {"$set": EMPTY_BID_STATS}
+
+
+def test_repair_leaves_matching_statistics_alone():
+    stats = {"bid_count": 1, "bid_price_sum": 80.0, "min_bid_price": 80.0, "max_bid_price": 80.0}
+    assert bid_stats_repair({"id": "r1", **stats}, stats) is None
+    assert bid_stats_repair({"id": "r2"}, None) is not None
@@ -0,0 +1,99 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+from cache import CacheBackend, MemoryCacheBackend, ResponseCache, TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=0)
+    cache.set("a", 1)
+    assert cache.get("a") is None
+
+
+def test_ttl_cache_delete_removes_only_that_key():
+    cache = TTLCache(maxsize=4, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.delete("a")
+    cache.delete("missing")
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+
+
+def test_response_cache_round_trips_body_and_headers():
+    async def scenario():
+        cache = ResponseCache(MemoryCacheBackend(), ttl=60)
+        key = await cache.key("listing", ("requests",), {"status": "open", "limit": 20})
+        assert await cache.get(key) is None
+        await cache.set(key, b'[{"id": "1"}]', {"X-Next-Cursor": "abc"})
+        assert await cache.get(key) == (b'[{"id": "1"}]', {"X-Next-Cursor": "abc"})
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_parameter_order_does_not_change_the_key():
+    async def scenario():
+        cache = ResponseCache(MemoryCacheBackend(), ttl=60)
+        first = await cache.key("listing", ("requests",), {"status": "open", "limit": 20})
+        second = await cache.key("listing", ("requests",), {"limit": 20, "status": "open"})
+        assert first == second
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_hides_entries_of_previous_generation():
+    async def scenario():
+        cache = ResponseCache(MemoryCacheBackend(), ttl=60)
+        params = {"status": "open"}
+        key = await cache.key("listing", ("requests", "bids"), params)
+        await cache.set(key, b"[]")
+        await cache.invalidate("bids")
+        assert await cache.get(await cache.key("listing", ("requests", "bids"), params)) is None
+
+    asyncio.run(scenario())
+
+
+def test_ttl_cache_bounded_by_total_bytes():
+    cache = TTLCache(maxsize=100, ttl=60, maxbytes=10)
+    cache.set("a", b"1234")
+    cache.set("b", b"1234")
+    cache.set("a", b"12")
+    assert cache.bytes == 6
+    cache.set("c", b"123456")
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12" and cache.get("c") == b"123456"
+    assert cache.bytes == 8
+
+
+def test_ttl_cache_skips_values_larger_than_the_byte_bound():
+    cache = TTLCache(maxsize=100, ttl=60, maxbytes=10)
+    cache.set("a", b"1234")
+    cache.set("huge", b"x" * 11)
+    assert cache.get("huge") is None
+    assert cache.get("a") == b"1234"
+
+
+def test_cache_backends_must_implement_every_operation():
+    class Partial(CacheBackend):
+        async def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
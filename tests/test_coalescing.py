@@ -0,0 +1,55 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from coalescing import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_execution():
+    async def scenario():
+        flight = SingleFlight("test")
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return ["result"]
+
+        results = await asyncio.gather(*(flight.do("key", load) for _ in range(5)))
+        assert calls == 1
+        assert all(result is results[0] for result in results)
+        assert flight.stats() == {"executions": 1, "coalesced": 4, "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+def test_sequential_calls_run_again():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def load():
+            return 1
+
+        await flight.do("key", load)
+        await asyncio.sleep(0)
+        await flight.do("key", load)
+        assert flight.executions == 2
+
+    asyncio.run(scenario())
+
+
+def test_errors_reach_every_waiter():
+    async def scenario():
+        flight = SingleFlight("test")
+
+        async def load():
+            await asyncio.sleep(0.01)
+            raise LookupError("missing")
+
+        results = await asyncio.gather(flight.do("key", load), flight.do("key", load), return_exceptions=True)
+        assert all(isinstance(result, LookupError) for result in results)
+
+    asyncio.run(scenario())
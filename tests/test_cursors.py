@@ -0,0 +1,100 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+from cursors import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """The subset of MongoDB query semantics keyset_filter produces"""
+    for field, condition in query.items():
+        if field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:  # None also matches a missing field
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$ne":
+                if value == operand:
+                    return False
+            elif value is None or not {"$gt": value > operand, "$lt": value < operand}[operator]:
+                return False
+    return True
+
+
+def mongo_sorted(docs: list, field: str, direction: int) -> list:
+    """MongoDB's order for {field: direction, id: direction}: nulls are the smallest values"""
+    def key(doc):
+        value = doc.get(field)
+        return (value is not None, value if value is not None else 0, doc["id"])
+    return sorted(docs, key=key, reverse=direction == -1)
+
+
+def paginate(docs: list, field: str, direction: int, limit: int) -> list:
+    ordered = mongo_sorted(docs, field, direction)
+    seen, cursor = [], None
+    while True:
+        if cursor:
+            value, last_id = decode_cursor(cursor, field, direction)
+            remaining = [doc for doc in ordered if matches(doc, keyset_filter(field, direction, value, last_id))]
+        else:
+            remaining = ordered
+        page = remaining[:limit]
+        seen += page
+        if len(page) < limit:
+            return seen
+        cursor = encode_cursor(field, direction, page[-1])
+
+
+# min_bid_price is null until a request receives its first bid
+REQUESTS = [
+    {"id": "a", "min_bid_price": 120.0},
+    {"id": "b", "min_bid_price": None},
+    {"id": "c", "min_bid_price": 80.0},
+    {"id": "d"},
+    {"id": "e", "min_bid_price": 120.0},
+    {"id": "f", "min_bid_price": None},
+    {"id": "g", "min_bid_price": 95.5}
+]
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+@pytest.mark.parametrize("limit", [1, 2, 3, 7])
+def test_pages_of_a_nullable_sort_cover_every_document_once_in_order(direction, limit):
+    pages = paginate(REQUESTS, "min_bid_price", direction, limit)
+    assert [doc["id"] for doc in pages] == [doc["id"] for doc in mongo_sorted(REQUESTS, "min_bid_price", direction)]
+
+
+def test_nulls_come_first_ascending_and_last_descending():
+    ascending = [doc["id"] for doc in paginate(REQUESTS, "min_bid_price", 1, 2)]
+    descending = [doc["id"] for doc in paginate(REQUESTS, "min_bid_price", -1, 2)]
+    assert ascending == ["b", "d", "f", "c", "g", "a", "e"]
+    assert descending == ["e", "a", "g", "c", "f", "d", "b"]
+
+
+def test_datetimes_survive_the_round_trip():
+    created_at = datetime(2025, 3, 4, 5, 6, 7, 891000)
+    cursor = encode_cursor("created_at", -1, {"id": "x", "created_at": created_at})
+    assert decode_cursor(cursor, "created_at", -1) == (created_at, "x")
+
+
+def test_cursor_from_another_sort_is_rejected():
+    cursor = encode_cursor("price", 1, {"id": "x", "price": 10.0})
+    with pytest.raises(InvalidCursor, match="sort order"):
+        decode_cursor(cursor, "price", -1)
+    with pytest.raises(InvalidCursor, match="sort order"):
+        decode_cursor(cursor, "created_at", 1)
+
+
+def test_malformed_cursors_are_rejected():
+    for cursor in ("not-a-cursor", "", "e30"):  # "e30" is base64 for {}
+        with pytest.raises(InvalidCursor):
+            decode_cursor(cursor, "price", 1)
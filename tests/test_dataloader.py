@@ -0,0 +1,72 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+from dataloader import DataLoader
+
+
+def recording_loader(batches):
+    async def batch_load(keys):
+        batches.append(list(keys))
+        return {key: key.upper() for key in keys if key != "missing"}
+    return DataLoader(batch_load)
+
+
+def test_loads_in_the_same_tick_share_one_deduplicated_batch():
+    async def scenario():
+        batches = []
+        loader = recording_loader(batches)
+        values = await loader.load_many(["a", "b", "a", "missing"])
+        assert values == ["A", "B", "A", None]
+        assert batches == [["a", "b", "missing"]]
+
+    asyncio.run(scenario())
+
+
+def test_loaded_keys_are_not_fetched_again():
+    async def scenario():
+        batches = []
+        loader = recording_loader(batches)
+        await loader.load("a")
+        assert await loader.load_many(["a", "c"]) == ["A", "C"]
+        assert batches == [["a"], ["c"]]
+
+    asyncio.run(scenario())
+
+
+def test_batch_errors_reach_every_caller():
+    async def scenario():
+        async def failing(keys):
+            raise RuntimeError("database unavailable")
+
+        loader = DataLoader(failing)
+        with pytest.raises(RuntimeError):
+            await loader.load_many(["a", "b"])
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_batches_cancel_every_caller():
+    async def scenario():
+        started = asyncio.Event()
+
+        async def hanging(keys):
+            started.set()
+            await asyncio.Event().wait()
+
+        loader = DataLoader(hanging)
+        waiting = asyncio.ensure_future(loader.load_many(["a", "b"]))
+        await started.wait()
+        assert len(loader.tasks) == 1
+        for task in list(loader.tasks):
+            task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        assert loader.futures["a"].cancelled() and loader.futures["b"].cancelled()
+        assert not loader.tasks
+
+    asyncio.run(scenario())
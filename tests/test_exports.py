@@ -0,0 +1,57 @@
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from exports import csv_lines, csv_cell, ndjson_lines
+
+
+class ListCursor:
+    """Stand-in for a Motor cursor over in-memory documents"""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.closed = False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for doc in self.docs:
+            yield doc
+
+    async def close(self):
+        self.closed = True
+
+
+async def collect(lines):
+    return b"".join([line async for line in lines])
+
+
+def test_csv_export_writes_header_and_one_row_per_document():
+    cursor = ListCursor([
+        {"id": "1", "title": "Fix sink, urgently", "services": ["Plumbing", "Repair"]},
+        {"id": "2", "title": None}
+    ])
+    output = asyncio.run(collect(csv_lines(cursor, ["id", "title", "services"])))
+    assert output.decode().splitlines() == [
+        "id,title,services",
+        '1,"Fix sink, urgently",Plumbing;Repair',
+        "2,,"
+    ]
+    assert cursor.closed
+
+
+def test_ndjson_export_serializes_each_document_on_its_own_line():
+    cursor = ListCursor([{"id": "1"}, {"id": "2"}])
+    output = asyncio.run(collect(ndjson_lines(cursor, lambda doc: json.dumps({**doc, "seen": True}).encode())))
+    assert output == b'{"id": "1", "seen": true}\n{"id": "2", "seen": true}\n'
+    assert cursor.closed
+
+
+def test_csv_cells_format_dates_and_missing_values():
+    assert csv_cell(datetime(2025, 1, 2, 3, 4)) == "2025-01-02T03:04:00"
+    assert csv_cell(None) == ""
@@ -0,0 +1,38 @@
+import io
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+pytest.importorskip("gridfs")
+pytest.importorskip("motor")
+
+from PIL import Image
+
+from image_store import UnsupportedImageType, content_safety_headers, detect_content_type
+
+
+def encode(image_format: str) -> bytes:
+    output = io.BytesIO()
+    Image.new("RGB", (4, 4), "red").save(output, image_format)
+    return output.getvalue()
+
+
+def test_content_type_comes_from_the_decoded_bytes():
+    assert detect_content_type(encode("PNG")) == "image/png"
+    assert detect_content_type(io.BytesIO(encode("JPEG"))) == "image/jpeg"
+
+
+def test_markup_is_rejected_whatever_it_claims_to_be():
+    svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+    for data in (svg, b"<html><script>alert(1)</script></html>", b""):
+        with pytest.raises(UnsupportedImageType):
+            detect_content_type(data)
+
+
+def test_unverified_types_are_served_as_downloads():
+    assert content_safety_headers("image/webp") == {"X-Content-Type-Options": "nosniff"}
+    assert content_safety_headers("image/svg+xml")["Content-Disposition"] == "attachment"
+    assert content_safety_headers("text/html")["Content-Disposition"] == "attachment"
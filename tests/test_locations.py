@@ -0,0 +1,79 @@
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+from locations import geocode, location_filter, normalize_location, split_location
+
+
+def test_split_location_resolves_state_codes_and_names():
+    assert split_location("Austin, TX") == ("austin", "TX")
+    assert split_location("  New   York ,  new york") == ("new york", "NY")
+    assert split_location("Austin, tx") == ("austin", "TX")
+    assert split_location("Austin") == ("austin", None)
+    assert split_location("Austin, Atlantis") == ("austin", None)
+
+
+def test_geocode_returns_a_geojson_point():
+    assert geocode("Austin, TX") == {"type": "Point", "coordinates": [-97.7431, 30.2672]}
+    assert geocode("austin, texas") == geocode("Austin, TX")
+
+
+def test_geocode_resolves_bare_city_names():
+    assert geocode("Seattle") == {"type": "Point", "coordinates": [-122.3321, 47.6062]}
+
+
+def test_geocode_unknown_or_empty_locations():
+    assert geocode(None) is None
+    assert geocode("") is None
+    assert geocode("Springfield, ZZ") is None
+    assert geocode("Nowhere") is None
+    # A known city under the wrong state is not guessed
+    assert geocode("Austin, CA") is None
+
+
+def test_normalize_location_stores_city_state_and_tokens():
+    assert normalize_location("St. Louis, MO") == {
+        "location_city": "st. louis",
+        "location_state": "mo",
+        "location_tokens": ["st", "louis", "mo"]
+    }
+    assert normalize_location("Boston, Massachusetts") == {
+        "location_city": "boston",
+        "location_state": "ma",
+        "location_tokens": ["boston", "massachusetts", "ma"]
+    }
+
+
+def test_normalize_location_without_a_location():
+    assert normalize_location(None) == {"location_city": None, "location_state": None, "location_tokens": []}
+    assert normalize_location("Remote")["location_state"] is None
+
+
+def matches(doc: dict, query: dict) -> bool:
+    """The subset of MongoDB query semantics location_filter produces"""
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+            continue
+        value = doc.get(field)
+        values = value if isinstance(value, list) else [value]
+        if isinstance(condition, dict):
+            if not any(isinstance(item, str) and re.match(condition["$regex"], item) for item in values):
+                return False
+        elif condition not in values:
+            return False
+    return True
+
+
+def test_requests_saved_through_the_model_are_found_once_normalized():
+    # Model defaults, as stored by a request created through ServiceRequest(...)
+    stored = {"location": "Houston, TX", "location_city": None, "location_state": None, "location_tokens": []}
+    queries = ["Houston, TX", "houston, texas", "Houston", "hous", "TX"]
+    assert not any(matches(stored, location_filter(query)) for query in queries)
+
+    stored.update(normalize_location(stored["location"]))
+    assert all(matches(stored, location_filter(query)) for query in queries)
+    assert not matches(stored, location_filter("Austin, TX"))
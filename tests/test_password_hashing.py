@@ -0,0 +1,44 @@
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+pytest.importorskip("passlib")
+pytest.importorskip("bcrypt")
+
+from password_hashing import PasswordHasher, PasswordHasherBusy
+
+
+def test_hash_and_verify_run_in_the_pool():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=4)
+        password_hash = await hasher.hash("secret")
+        assert await hasher.verify_and_update("secret", password_hash) == (True, None)
+        assert (await hasher.verify_and_update("wrong", password_hash))[0] is False
+        assert hasher.stats()["completed"] == 3
+
+    asyncio.run(scenario())
+
+
+def test_changed_cost_triggers_rehash():
+    async def scenario():
+        old_hash = await PasswordHasher(rounds=4, workers=1, max_pending=4).hash("secret")
+        hasher = PasswordHasher(rounds=5, workers=1, max_pending=4)
+        valid, new_hash = await hasher.verify_and_update("secret", old_hash)
+        assert valid and new_hash.startswith("$2b$05$")
+        assert hasher.stats()["rehashed"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_rejects_new_work():
+    async def scenario():
+        hasher = PasswordHasher(rounds=4, workers=1, max_pending=1)
+        results = await asyncio.gather(hasher.hash("a"), hasher.hash("b"), return_exceptions=True)
+        assert isinstance(results[1], PasswordHasherBusy)
+        assert hasher.stats()["rejected"] == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,109 @@
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import pytest
+
+from query_builder import FilterBuilder, build_service_request_filter, urgency_filter
+
+NOW = datetime(2025, 1, 1)
+
+
+def test_no_parameters_matches_everything():
+    assert build_service_request_filter(now=NOW) == {}
+
+
+def test_independent_clauses_are_merged():
+    assert build_service_request_filter(category="Home Services", status="open", now=NOW) == {
+        "category": "Home Services",
+        "status": "open"
+    }
+
+
+def test_flexible_urgency_and_missing_images_are_both_applied():
+    assert build_service_request_filter(urgency="flexible", has_images=False, now=NOW) == {
+        "$or": [
+            {"deadline": {"$gt": NOW + timedelta(days=14)}},
+            {"deadline": None}
+        ],
+        "images.0": {"$exists": False}
+    }
+
+
+def test_two_or_clauses_both_survive():
+    builder = FilterBuilder()
+    builder.add({"$or": [{"a": 1}, {"a": 2}]}).add({"$or": [{"b": 1}, {"b": 2}]})
+    assert builder.build() == {"$and": [
+        {"$or": [{"a": 1}, {"a": 2}]},
+        {"$or": [{"b": 1}, {"b": 2}]}
+    ]}
+
+
+def test_budget_range_overlap_uses_compound_index_fields():
+    assert build_service_request_filter(budget_min=100, budget_max=500, now=NOW) == {
+        "budget_min": {"$lte": 500},
+        "budget_max": {"$gte": 100}
+    }
+
+
+def test_budget_aliases_are_normalized():
+    assert build_service_request_filter(min_budget=100, max_budget=500, now=NOW) == \
+        build_service_request_filter(budget_min=100, budget_max=500, now=NOW)
+
+
+def test_explicit_zero_budget_is_not_replaced_by_alias():
+    assert build_service_request_filter(budget_min=0, min_budget=250, now=NOW) == {
+        "budget_max": {"$gte": 0}
+    }
+
+
+def test_deadline_range_and_urgency_on_same_field_are_combined():
+    query = build_service_request_filter(
+        deadline_after="2025-01-02T00:00:00",
+        urgency="urgent",
+        now=NOW
+    )
+    assert query == {"$and": [
+        {"deadline": {"$gt": datetime(2025, 1, 2)}},
+        {"deadline": {"$lte": NOW + timedelta(days=3)}}
+    ]}
+
+
+def test_invalid_deadline_raises_value_error():
+    with pytest.raises(ValueError):
+        build_service_request_filter(deadline_before="next tuesday", now=NOW)
+
+
+def test_urgency_levels_partition_deadlines():
+    assert urgency_filter("urgent", NOW) == {"deadline": {"$lte": NOW + timedelta(days=3)}}
+    assert urgency_filter("moderate", NOW) == {"deadline": {
+        "$lte": NOW + timedelta(days=14),
+        "$gt": NOW + timedelta(days=3)
+    }}
+    assert urgency_filter("flexible", NOW) == {"$or": [
+        {"deadline": {"$gt": NOW + timedelta(days=14)}},
+        {"deadline": None}
+    ]}
+
+
+def test_has_images_checks_first_element():
+    assert build_service_request_filter(has_images=True, now=NOW) == {"images.0": {"$exists": True}}
+
+
+def test_city_and_state_location_is_an_equality_lookup():
+    assert build_service_request_filter(location="Austin, Texas", now=NOW) == {
+        "location_city": "austin",
+        "location_state": "tx"
+    }
+
+
+def test_partial_location_matches_token_prefix_with_regex_escaped():
+    assert build_service_request_filter(location="san fr.*", now=NOW) == {"$and": [
+        {"location_tokens": "san"},
+        {"location_tokens": {"$regex": "^fr"}}
+    ]}
+    assert build_service_request_filter(location="(a+)+$", now=NOW) == {
+        "location_tokens": {"$regex": "^a"}
+    }
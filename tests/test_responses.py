@@ -0,0 +1,34 @@
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+
+import orjson
+import pytest
+
+bson = pytest.importorskip("bson")
+pytest.importorskip("fastapi")
+
+from responses import MongoJSONResponse, serialize_mongo_doc
+
+
+def test_orjson_response_matches_serialize_mongo_doc():
+    docs = [{
+        "_id": bson.ObjectId(),
+        "id": "1",
+        "created_at": datetime(2025, 1, 2, 3, 4, 5, 678000),
+        "owner": bson.ObjectId("65a000000000000000000001"),
+        "tags": ["a", "b"],
+        "geo": {"type": "Point", "coordinates": [-97.7, 30.3]},
+        # Embedded documents, as joined in by $lookup
+        "service_request": {"_id": bson.ObjectId(), "id": "r1", "bids": [{"_id": bson.ObjectId(), "id": "b1"}]}
+    }]
+    expected = serialize_mongo_doc(docs)
+    body = MongoJSONResponse(docs).body
+    assert orjson.loads(body) == expected
+    assert body == (
+        b'[{"id":"1","created_at":"2025-01-02T03:04:05.678000","owner":"65a000000000000000000001",'
+        b'"tags":["a","b"],"geo":{"type":"Point","coordinates":[-97.7,30.3]},'
+        b'"service_request":{"id":"r1","bids":[{"id":"b1"}]}}]'
+    )